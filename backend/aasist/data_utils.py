@@ -1,3 +1,8 @@
+import json
+import os
+from multiprocessing import Pool
+from pathlib import Path
+
 import numpy as np
 import soundfile as sf
 import torch
@@ -36,36 +41,266 @@ def genSpoof_list(dir_meta, is_train=False, is_eval=False):
         return d_meta, file_list
 
 
-def pad(x, max_len=64600):
+def fill_row(out, x, random_start=False):
+    """Write `x` cropped or repeated to exactly `len(out)` samples into `out`.
+
+    Long inputs are cropped (from a random offset with `random_start`),
+    short ones repeated so that out[j] == x[j % len(x)]. The repeat is done
+    by doubling copies inside `out`, so no temporary arrays are created.
+    """
+    max_len = out.shape[0]
     x_len = x.shape[0]
+    if x_len == 0:
+        raise ValueError("cannot fill a row from an empty input")
     if x_len >= max_len:
+        stt = 0
+        if random_start and x_len > max_len:
+            stt = np.random.randint(x_len - max_len)
+        out[:] = x[stt:stt + max_len]
+        return out
+    out[:x_len] = x
+    filled = x_len
+    while filled < max_len:
+        n = min(filled, max_len - filled)
+        out[filled:filled + n] = out[:n]
+        filled += n
+    return out
+
+
+def pad_batch(xs, max_len=64600, out=None, random_start=False):
+    """Crop/repeat a list of 1-D arrays into one (batch, max_len) buffer.
+
+    `out` may be a preallocated float32 array (e.g. a pinned tensor's
+    `.numpy()` view) that is reused across batches.
+    """
+    if out is None:
+        out = np.empty((len(xs), max_len), dtype=np.float32)
+    for row, x in zip(out, xs):
+        fill_row(row, x, random_start)
+    return out
+
+
+def pad(x, max_len=64600):
+    if x.shape[0] >= max_len:
         return x[:max_len]
-    # need to pad
-    num_repeats = int(max_len / x_len) + 1
-    padded_x = np.tile(x, (1, num_repeats))[:, :max_len][0]
-    return padded_x
+    return fill_row(np.empty(max_len, dtype=x.dtype), x)
 
 
 def pad_random(x: np.ndarray, max_len: int = 64600):
-    x_len = x.shape[0]
-    # if duration is already long enough
-    if x_len >= max_len:
-        stt = np.random.randint(x_len - max_len)
-        return x[stt:stt + max_len]
+    return fill_row(np.empty(max_len, dtype=x.dtype), x, random_start=True)
+
+
+class PadCollate:
+    """DataLoader collate_fn that assembles a whole batch in one buffer.
+
+    Items are (1-D array, label or key) pairs of any length, as returned by
+    the datasets with `pad=False`. Waveforms are written straight into a
+    (batch, max_len) float32 tensor; labels become an int64 tensor and
+    string keys stay a list.
+    """
+
+    def __init__(self, max_len=64600, random_start=False):
+        self.max_len = max_len
+        self.random_start = random_start
+
+    def __call__(self, batch):
+        xs, ys = zip(*batch)
+        out = torch.empty((len(xs), self.max_len), dtype=torch.float32)
+        pad_batch(xs, self.max_len, out.numpy(), self.random_start)
+        if isinstance(ys[0], str):
+            return out, list(ys)
+        return out, torch.as_tensor(ys, dtype=torch.int64)
+
+
+def read_cut(path, cut, random_start=False):
+    """Decode at most `cut` samples from an audio file.
+
+    Only the frames that will be used are read (via seek + frame-limited
+    read), so long files are never decoded in full. With `random_start`,
+    files longer than `cut` are read from a random offset, matching the
+    crop `pad_random` would take.
+    """
+    with sf.SoundFile(path) as f:
+        stt = 0
+        if random_start and f.frames > cut:
+            stt = np.random.randint(f.frames - cut)
+        f.seek(stt)
+        return f.read(frames=cut)
+
+
+CACHE_DTYPES = {"int16": np.int16, "float16": np.float16,
+                "float32": np.float32}
+
+
+def _fill_cache(job):
+    """Decode a chunk of files into their slots of the cache file."""
+    data_path, dtype, total, chunk = job
+    out = np.memmap(data_path, dtype=CACHE_DTYPES[dtype], mode="r+",
+                    shape=(total,))
+    for path, offset, length in chunk:
+        if dtype == "int16":
+            x = sf.read(path, dtype="int16")[0]
+        else:
+            x = sf.read(path, dtype="float32")[0].astype(CACHE_DTYPES[dtype])
+        out[offset:offset + length] = x[:length]
+    out.flush()
+    return len(chunk)
+
+
+class DecodedCache:
+    """Decoded utterances stored back to back in one memory-mapped file.
+
+    `<path>.bin` holds the samples (int16, float16 or float32),
+    `<path>.idx.npz` the keys with their offset, length and label (-1 if
+    unknown) and `<path>.json` free-form metadata. Full utterances are
+    stored, so training can still take random crops. The memmap is opened
+    lazily in each process, so the object is cheap to send to DataLoader
+    workers, and every read is a slice of it: no file is opened per item.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        index = np.load(self.index_path(self.path))
+        self.dtype = str(index["dtype"])
+        self.offsets = index["offsets"]
+        self.lengths = index["lengths"]
+        self.keys = index["keys"].tolist()
+        self.labels = (index["labels"] if "labels" in index.files
+                       else np.full(len(self.keys), -1, dtype=np.int8))
+        self.slot = {key: i for i, key in enumerate(self.keys)}
+        meta_path = self.meta_path(self.path)
+        self.metadata = (json.loads(meta_path.read_text())
+                         if meta_path.exists() else {})
+        self._data = None
+        self._pid = None
+
+    @staticmethod
+    def data_path(path):
+        return Path(f"{path}.bin")
 
-    # if too short
-    num_repeats = int(max_len / x_len) + 1
-    padded_x = np.tile(x, (num_repeats))[:max_len]
-    return padded_x
+    @staticmethod
+    def index_path(path):
+        return Path(f"{path}.idx.npz")
+
+    @staticmethod
+    def meta_path(path):
+        return Path(f"{path}.json")
+
+    @classmethod
+    def build(cls, path, list_IDs, base_dir, dtype="int16", num_workers=0,
+              labels=None, metadata=None):
+        """Decode every `base_dir/flac/<key>.flac` into a new cache at `path`.
+
+        `labels` (key -> int) and `metadata` (dict) are stored alongside.
+        """
+        if dtype not in CACHE_DTYPES:
+            raise ValueError("cache dtype must be one of {}".format(
+                list(CACHE_DTYPES)))
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        files = [str(Path(base_dir) / f"flac/{key}.flac") for key in list_IDs]
+        infos = [sf.info(f) for f in files]
+        lengths = np.array([info.frames for info in infos], dtype=np.int64)
+        offsets = np.zeros_like(lengths)
+        np.cumsum(lengths[:-1], out=offsets[1:])
+        total = int(lengths.sum())
+
+        np.memmap(cls.data_path(path), dtype=CACHE_DTYPES[dtype], mode="w+",
+                  shape=(max(total, 1),)).flush()
+        work = list(zip(files, offsets.tolist(), lengths.tolist()))
+        step = 256
+        jobs = [(cls.data_path(path), dtype, max(total, 1), work[i:i + step])
+                for i in range(0, len(work), step)]
+        if num_workers > 0:
+            with Pool(num_workers) as pool:
+                for _ in pool.imap_unordered(_fill_cache, jobs):
+                    pass
+        else:
+            for job in jobs:
+                _fill_cache(job)
+
+        label_arr = np.array([labels.get(key, -1) if labels else -1
+                              for key in list_IDs], dtype=np.int8)
+        meta = dict(metadata or {})
+        meta.update({
+            "dtype": dtype,
+            "sample_rate": infos[0].samplerate if infos else None,
+            "count": len(list_IDs),
+            "total_samples": total,
+        })
+        cls.meta_path(path).write_text(json.dumps(meta, indent=2))
+
+        # The index is written last, so an interrupted build is never used
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp, keys=np.array(list_IDs), offsets=offsets,
+                 lengths=lengths, labels=label_arr, dtype=np.array(dtype))
+        os.replace(tmp, cls.index_path(path))
+        return cls(path)
+
+    @classmethod
+    def open_or_build(cls, path, list_IDs, base_dir, dtype="int16",
+                      num_workers=0):
+        """Reuse the cache at `path` if it holds exactly `list_IDs`."""
+        if cls.index_path(path).exists():
+            cache = cls(path)
+            if cache.dtype == dtype and cache.keys == list(list_IDs):
+                return cache
+        print("Building decoded cache {} ({} files)".format(path, len(list_IDs)))
+        return cls.build(path, list_IDs, base_dir, dtype, num_workers)
+
+    @property
+    def data(self):
+        if self._data is None or self._pid != os.getpid():
+            total = max(int(self.lengths.sum()), 1)
+            self._data = np.memmap(self.data_path(self.path),
+                                   dtype=CACHE_DTYPES[self.dtype], mode="r",
+                                   shape=(total,))
+            self._pid = os.getpid()
+        return self._data
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.slot
+
+    def get(self, i):
+        """Utterance `i` as a read-only view of the memmap (no copy)."""
+        offset = int(self.offsets[i])
+        return self.data[offset:offset + int(self.lengths[i])]
+
+    def read_cut_at(self, i, cut, random_start=False):
+        """Same contract as `read_cut`, for utterance `i`.
+
+        float32 corpora return a view of the memmap; int16/float16 ones
+        are converted to float32.
+        """
+        offset, length = int(self.offsets[i]), int(self.lengths[i])
+        stt = 0
+        if random_start and length > cut:
+            stt = np.random.randint(length - cut)
+        x = self.data[offset + stt:offset + min(length, stt + cut)]
+        if self.dtype == "int16":
+            return x.astype(np.float32) / 32768
+        if self.dtype == "float16":
+            return x.astype(np.float32)
+        return x
+
+    def read_cut(self, key, cut, random_start=False):
+        return self.read_cut_at(self.slot[key], cut, random_start)
 
 
 class Dataset_ASVspoof2019_train(Dataset):
-    def __init__(self, list_IDs, labels, base_dir):
+    def __init__(self, list_IDs, labels, base_dir, cache=None, pad=True):
         """self.list_IDs	: list of strings (each string: utt key),
-           self.labels      : dictionary (key: utt key, value: label integer)"""
+           self.labels      : dictionary (key: utt key, value: label integer)
+           self.cache       : optional DecodedCache used instead of the FLACs
+           self.pad         : pad here; False leaves it to PadCollate"""
         self.list_IDs = list_IDs
         self.labels = labels
         self.base_dir = base_dir
+        self.cache = cache
+        self.pad = pad
         self.cut = 64600  # take ~4 sec audio (64600 samples)
 
     def __len__(self):
@@ -73,19 +308,29 @@ class Dataset_ASVspoof2019_train(Dataset):
 
     def __getitem__(self, index):
         key = self.list_IDs[index]
-        X, _ = sf.read(str(self.base_dir / f"flac/{key}.flac"))
-        X_pad = pad_random(X, self.cut)
-        x_inp = Tensor(X_pad)
+        if self.cache is not None:
+            X = self.cache.read_cut(key, self.cut, random_start=True)
+        else:
+            X = read_cut(str(self.base_dir / f"flac/{key}.flac"), self.cut,
+                         random_start=True)
         y = self.labels[key]
+        if not self.pad:
+            return X, y
+        X_pad = X if X.shape[0] >= self.cut else pad_random(X, self.cut)
+        x_inp = Tensor(X_pad)
         return x_inp, y
 
 
 class Dataset_ASVspoof2019_devNeval(Dataset):
-    def __init__(self, list_IDs, base_dir):
+    def __init__(self, list_IDs, base_dir, cache=None, pad=True):
         """self.list_IDs	: list of strings (each string: utt key),
+           self.cache       : optional DecodedCache used instead of the FLACs
+           self.pad         : pad here; False leaves it to PadCollate
         """
         self.list_IDs = list_IDs
         self.base_dir = base_dir
+        self.cache = cache
+        self.pad = pad
         self.cut = 64600  # take ~4 sec audio (64600 samples)
 
     def __len__(self):
@@ -93,7 +338,42 @@ class Dataset_ASVspoof2019_devNeval(Dataset):
 
     def __getitem__(self, index):
         key = self.list_IDs[index]
-        X, _ = sf.read(str(self.base_dir / f"flac/{key}.flac"))
+        if self.cache is not None:
+            X = self.cache.read_cut(key, self.cut)
+        else:
+            X = read_cut(str(self.base_dir / f"flac/{key}.flac"), self.cut)
+        if not self.pad:
+            return X, key
         X_pad = pad(X, self.cut)
         x_inp = Tensor(X_pad)
         return x_inp, key
+
+
+class Dataset_ASVspoof2019_packed(Dataset):
+    def __init__(self, path, is_train=False, pad=True):
+        """Serve a split packed by pack_dataset.py.
+
+        With `is_train`, items are (random ~4 sec crop, label) as in
+        Dataset_ASVspoof2019_train; otherwise (first ~4 sec, key) as in
+        Dataset_ASVspoof2019_devNeval. `pad=False` leaves padding to
+        PadCollate.
+        """
+        self.corpus = DecodedCache(path)
+        self.is_train = is_train
+        self.pad = pad
+        self.cut = 64600  # take ~4 sec audio (64600 samples)
+
+    def __len__(self):
+        return len(self.corpus)
+
+    def __getitem__(self, index):
+        X = self.corpus.read_cut_at(index, self.cut,
+                                    random_start=self.is_train)
+        y = (int(self.corpus.labels[index]) if self.is_train
+             else self.corpus.keys[index])
+        if not self.pad:
+            return X, y
+        if self.is_train:
+            X_pad = X if X.shape[0] >= self.cut else pad_random(X, self.cut)
+            return Tensor(X_pad), y
+        return Tensor(pad(X, self.cut)), y
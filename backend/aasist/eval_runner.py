@@ -0,0 +1,224 @@
+"""
+Parallel, resumable evaluation of a trained model on the eval protocol.
+
+The trial list is cut into contiguous shards which worker processes score
+independently (CPU or GPU). Each finished shard is written atomically to
+<output_dir>/shards/, so a rerun after a crash only scores the missing
+shards. shards/manifest.json records the model file, trial file and shard
+count the shards belong to; if any of them changed, the old shards are
+discarded. The shards are then merged in trial order into the usual score
+file and EER / min t-DCF are reported.
+
+Usage:
+    python eval_runner.py --config ./config/AASIST.conf --workers 4
+"""
+import argparse
+import json
+import os
+import time
+from multiprocessing import get_context
+from pathlib import Path
+
+import torch
+from torch.utils.data import DataLoader
+
+from data_utils import DecodedCache, Dataset_ASVspoof2019_devNeval, PadCollate
+from evaluation import ScoreAccumulator, load_asv_scores, read_score_file
+
+_worker = {}
+
+
+def _init_worker(model_config, model_path, device, threads):
+    """Load the model once per worker process."""
+    from main import get_model
+
+    torch.set_num_threads(threads)
+    model = get_model(model_config, device)
+    model.load_state_dict(torch.load(model_path, map_location=device))
+    model.eval()
+    _worker.update(model=model, device=device)
+
+
+def _score_shard(job):
+    """Score one shard of trials and write it atomically; return its index."""
+    index, trials, base_dir, cache_path, batch_size, out_path = job
+    keys = [trl[1] for trl in trials]
+    cache = DecodedCache(cache_path) if cache_path else None
+    dataset = Dataset_ASVspoof2019_devNeval(list_IDs=keys,
+                                            base_dir=Path(base_dir),
+                                            cache=cache, pad=False)
+    loader = DataLoader(dataset, batch_size=batch_size, shuffle=False,
+                        collate_fn=PadCollate(max_len=64600))
+    model, device = _worker["model"], _worker["device"]
+    lines = []
+    with torch.no_grad():
+        for batch_x, utt_id in loader:
+            _, batch_out = model(batch_x.to(device))
+            batch_score = batch_out[:, 1].cpu().numpy().ravel().tolist()
+            for utt, sco in zip(utt_id, batch_score):
+                _, key_id, _, src, key = trials[len(lines)]
+                assert utt == key_id
+                lines.append("{} {} {} {}\n".format(utt, src, key, sco))
+
+    tmp = out_path.with_suffix(".tmp")
+    with open(tmp, "w") as fh:
+        fh.writelines(lines)
+    os.replace(tmp, out_path)
+    return index, len(lines)
+
+
+def shard_trials(trials, n_shards):
+    """Split the trial list into `n_shards` contiguous, near-equal parts."""
+    if not trials:
+        return []
+    if n_shards < 1:
+        raise ValueError("n_shards must be at least 1")
+    size, extra = divmod(len(trials), n_shards)
+    shards, start = [], 0
+    for i in range(n_shards):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(trials[start:end])
+        start = end
+    return shards
+
+
+def _file_identity(path):
+    st = os.stat(path)
+    return {"path": os.path.realpath(path), "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns}
+
+
+def _reset_stale_shards(shard_dir, manifest):
+    """Drop existing shards unless they were scored for `manifest`."""
+    manifest_path = shard_dir / "manifest.json"
+    try:
+        with open(manifest_path, "r") as fh:
+            if json.load(fh) == manifest:
+                return
+    except (OSError, ValueError):
+        pass
+    stale = list(shard_dir.glob("shard_*.txt"))
+    if stale:
+        print("Discarding {} shards scored for another model, trial list "
+              "or shard count".format(len(stale)))
+    for path in stale:
+        path.unlink()
+    tmp = manifest_path.with_suffix(".tmp")
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp, manifest_path)
+
+
+def _shard_done(path, n_trials):
+    if not path.exists():
+        return False
+    with open(path, "rb") as fh:
+        return sum(1 for _ in fh) == n_trials
+
+
+def main(args):
+    with open(args.config, "r") as f_json:
+        config = json.loads(f_json.read())
+    track = config["track"]
+    database_path = Path(config["database_path"])
+    prefix_2019 = "ASVspoof2019.{}".format(track)
+    eval_trial_path = (
+        database_path /
+        "ASVspoof2019_{}_cm_protocols/{}.cm.eval.trl.txt".format(
+            track, prefix_2019))
+    eval_database_path = database_path / "ASVspoof2019_{}_eval/".format(track)
+    model_path = args.model_path or config["model_path"]
+
+    device = args.device or ("cuda" if torch.cuda.is_available() else "cpu")
+    workers = max(1, args.workers)
+    threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+    batch_size = args.batch_size or config["batch_size"]
+
+    output_dir = Path(args.output_dir)
+    shard_dir = output_dir / "shards"
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    with open(eval_trial_path, "r") as f_trl:
+        trials = [line.strip().split(" ") for line in f_trl if line.strip()]
+    if not trials:
+        raise SystemExit("No trials in {}".format(eval_trial_path))
+    n_shards = args.shards or workers * 4
+    shards = shard_trials(trials, min(n_shards, len(trials)))
+    shard_paths = [shard_dir / "shard_{:05d}.txt".format(i)
+                   for i in range(len(shards))]
+    _reset_stale_shards(shard_dir, {
+        "model": _file_identity(model_path),
+        "trials": _file_identity(eval_trial_path),
+        "n_shards": len(shards),
+    })
+
+    cache_path = None
+    if args.cache_dir:
+        cache_path = str(Path(args.cache_dir) / "{}_eval".format(track))
+        DecodedCache.open_or_build(cache_path, [trl[1] for trl in trials],
+                                   eval_database_path, num_workers=workers)
+
+    todo = [i for i, (shard, path) in enumerate(zip(shards, shard_paths))
+            if not _shard_done(path, len(shard))]
+    print("Device: {}, workers: {} x {} threads".format(device, workers, threads))
+    print("{} trials in {} shards, {} already done".format(
+        len(trials), len(shards), len(shards) - len(todo)))
+
+    start = time.perf_counter()
+    if todo:
+        jobs = [(i, shards[i], str(eval_database_path), cache_path,
+                 batch_size, shard_paths[i]) for i in todo]
+        # spawn: forked CUDA contexts and OpenMP pools are not safe to reuse
+        ctx = get_context("spawn")
+        with ctx.Pool(workers, initializer=_init_worker,
+                      initargs=(config["model_config"], model_path, device,
+                                threads)) as pool:
+            for n_done, (i, n) in enumerate(
+                    pool.imap_unordered(_score_shard, jobs), 1):
+                print("shard {:05d} done ({} trials, {}/{})".format(
+                    i, n, n_done, len(jobs)))
+    elapsed = time.perf_counter() - start
+
+    # merge in trial order and accumulate metrics on the way
+    scores = ScoreAccumulator(capacity=len(trials))
+    score_path = output_dir / config["eval_output"]
+    with open(score_path, "w") as out:
+        for path in shard_paths:
+            with open(path, "r") as fh:
+                out.write(fh.read())
+            part = read_score_file(path, [("utt_id", None), ("source", "str"),
+                                          ("key", "str"), ("score", "float")])
+            scores.add(part["score"], labels=part["key"], sources=part["source"])
+    assert len(scores) == len(trials)
+    print("Scores saved to {}".format(score_path))
+    if todo:
+        print("Scored {} trials in {:.1f} s ({:.1f} trials/s)".format(
+            sum(len(shards[i]) for i in todo), elapsed,
+            sum(len(shards[i]) for i in todo) / elapsed))
+
+    eval_eer, eval_tdcf = scores.tDCF_EER(
+        load_asv_scores(database_path / config["asv_score_path"]),
+        output_file=output_dir / "t-DCF_EER.txt", printout=True)
+    print("EER: {:.3f}, min t-DCF: {:.5f}".format(eval_eer, eval_tdcf))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded, resumable evaluation")
+    parser.add_argument("--config", type=str, required=True,
+                        help="configuration file")
+    parser.add_argument("--model_path", type=str, default=None,
+                        help="weights to evaluate (default: config \"model_path\")")
+    parser.add_argument("--output_dir", type=str, default="./exp_result/eval",
+                        help="score file, report and shards/ go here")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="scoring processes")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="torch threads per worker (default: cores / workers)")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="number of shards (default: 4 per worker)")
+    parser.add_argument("--batch_size", type=int, default=None)
+    parser.add_argument("--device", type=str, default=None,
+                        choices=["cpu", "cuda"])
+    parser.add_argument("--cache_dir", type=str, default=None,
+                        help="use (or build) the decoded eval cache here")
+    main(parser.parse_args())
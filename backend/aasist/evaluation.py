@@ -1,9 +1,81 @@
+import functools
 import sys
 import os
 
 import numpy as np
 
 
+COST_MODEL = {
+    'Pspoof': 0.05,  # Prior probability of a spoofing attack
+    'Ptar': (1 - 0.05) * 0.99,  # Prior probability of target speaker
+    'Pnon': (1 - 0.05) * 0.01,  # Prior probability of nontarget speaker
+    'Cmiss': 1,  # Cost of ASV system falsely rejecting target speaker
+    'Cfa': 10,  # Cost of ASV system falsely accepting nontarget speaker
+    'Cmiss_asv': 1,  # Cost of ASV system falsely rejecting target speaker
+    'Cfa_asv':
+    10,  # Cost of ASV system falsely accepting nontarget speaker
+    'Cmiss_cm': 1,  # Cost of CM system falsely rejecting target speaker
+    'Cfa_cm': 10,  # Cost of CM system falsely accepting spoof
+}
+
+ATTACK_TYPES = [f'A{_id:02d}' for _id in range(7, 20)]
+
+
+def read_score_file(path, columns, chunk_bytes=1 << 26):
+    """Parse a whitespace-separated score file into typed column arrays.
+
+    `columns` gives one (name, kind) per field, kind being 'float', 'str'
+    or None to skip the field. The file is read in chunks of about
+    `chunk_bytes`, and each chunk is split and converted per column with
+    numpy, so no per-line Python objects are kept.
+    """
+    n_cols = len(columns)
+    parts = {name: [] for name, kind in columns if kind is not None}
+    rest = b''
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                block, rest = rest, b''
+            else:
+                block = rest + block
+                cut = block.rfind(b'\n') + 1
+                block, rest = block[:cut], block[cut:]
+            tokens = block.split()
+            if tokens:
+                if len(tokens) % n_cols:
+                    raise ValueError(
+                        f'{path}: expected {n_cols} fields on every line')
+                table = np.array(tokens).reshape(-1, n_cols)
+                for i, (name, kind) in enumerate(columns):
+                    if kind == 'float':
+                        parts[name].append(table[:, i].astype(np.float64))
+                    elif kind == 'str':
+                        parts[name].append(table[:, i].astype(str))
+            if not block and not rest:
+                break
+    empty = {'float': np.float64, 'str': str}
+    return {name: (np.concatenate(parts[name]) if parts[name]
+                   else np.array([], dtype=empty[kind]))
+            for name, kind in columns if kind is not None}
+
+
+@functools.lru_cache(maxsize=4)
+def _load_asv_scores(path, mtime):
+    asv = read_score_file(path, [('source', None), ('key', 'str'),
+                                 ('score', 'float')])
+    asv_keys, asv_scores = asv['key'], asv['score']
+    return (asv_scores[asv_keys == 'target'],
+            asv_scores[asv_keys == 'nontarget'],
+            asv_scores[asv_keys == 'spoof'])
+
+
+def load_asv_scores(asv_score_file):
+    """Target, nontarget and spoof ASV scores (parsed once per file version)."""
+    path = str(asv_score_file)
+    return _load_asv_scores(path, os.path.getmtime(path))
+
+
 def calculate_tDCF_EER(cm_scores_file,
                        asv_score_file,
                        output_file,
@@ -15,60 +87,43 @@ def calculate_tDCF_EER(cm_scores_file,
     # the second argument.
     # asv_score_file = 'ASVspoof2019.LA.asv.eval.gi.trl.scores.txt'
 
-    # Fix tandem detection cost function (t-DCF) parameters
-    Pspoof = 0.05
-    cost_model = {
-        'Pspoof': Pspoof,  # Prior probability of a spoofing attack
-        'Ptar': (1 - Pspoof) * 0.99,  # Prior probability of target speaker
-        'Pnon': (1 - Pspoof) * 0.01,  # Prior probability of nontarget speaker
-        'Cmiss': 1,  # Cost of ASV system falsely rejecting target speaker
-        'Cfa': 10,  # Cost of ASV system falsely accepting nontarget speaker
-        'Cmiss_asv': 1,  # Cost of ASV system falsely rejecting target speaker
-        'Cfa_asv':
-        10,  # Cost of ASV system falsely accepting nontarget speaker
-        'Cmiss_cm': 1,  # Cost of CM system falsely rejecting target speaker
-        'Cfa_cm': 10,  # Cost of CM system falsely accepting spoof
-    }
-
-    # Load organizers' ASV scores
-    asv_data = np.genfromtxt(asv_score_file, dtype=str)
-    # asv_sources = asv_data[:, 0]
-    asv_keys = asv_data[:, 1]
-    asv_scores = asv_data[:, 2].astype(np.float)
-
     # Load CM scores
-    cm_data = np.genfromtxt(cm_scores_file, dtype=str)
-    # cm_utt_id = cm_data[:, 0]
-    cm_sources = cm_data[:, 1]
-    cm_keys = cm_data[:, 2]
-    cm_scores = cm_data[:, 3].astype(np.float)
-
-    # Extract target, nontarget, and spoof scores from the ASV scores
-    tar_asv = asv_scores[asv_keys == 'target']
-    non_asv = asv_scores[asv_keys == 'nontarget']
-    spoof_asv = asv_scores[asv_keys == 'spoof']
+    cm_data = read_score_file(cm_scores_file, [('utt_id', None),
+                                               ('source', 'str'),
+                                               ('key', 'str'),
+                                               ('score', 'float')])
+    cm_sources = cm_data['source']
+    cm_keys = cm_data['key']
+    cm_scores = cm_data['score']
 
     # Extract bona fide (real human) and spoof scores from the CM scores
-    bona_cm = cm_scores[cm_keys == 'bonafide']
-    spoof_cm = cm_scores[cm_keys == 'spoof']
+    is_bona = cm_keys == 'bonafide'
+    is_spoof = cm_keys == 'spoof'
+    return compute_tDCF_EER(cm_scores[is_bona], cm_scores[is_spoof],
+                            cm_sources[is_spoof],
+                            load_asv_scores(asv_score_file),
+                            output_file, printout)
+
+
+def compute_tDCF_EER(bona_cm, spoof_cm, spoof_sources, asv_scores,
+                     output_file, printout=True):
+    """EER (%) and min t-DCF from score arrays, as calculate_tDCF_EER.
+
+    `asv_scores` is the (target, nontarget, spoof) tuple returned by
+    load_asv_scores. With `printout`, the per-attack breakdown is written
+    to `output_file` and printed.
+    """
+    tar_asv, non_asv, spoof_asv = asv_scores
 
     # EERs of the standalone systems and fix ASV operating point to
     # EER threshold
     eer_asv, asv_threshold = compute_eer(tar_asv, non_asv)
-    eer_cm = compute_eer(bona_cm, spoof_cm)[0]
 
-    attack_types = [f'A{_id:02d}' for _id in range(7, 20)]
-    if printout:
-        spoof_cm_breakdown = {
-            attack_type: cm_scores[cm_sources == attack_type]
-            for attack_type in attack_types
-        }
-
-        eer_cm_breakdown = {
-            attack_type: compute_eer(bona_cm,
-                                     spoof_cm_breakdown[attack_type])[0]
-            for attack_type in attack_types
-        }
+    # One sort gives the pooled CM EER, its DET curve for the t-DCF and
+    # (if needed) the EER of every attack type
+    groups = ATTACK_TYPES if printout else []
+    eer_cm, eer_cm_breakdown, det_curve = compute_eer_breakdown(
+        bona_cm, spoof_cm, spoof_sources, groups)
 
     [Pfa_asv, Pmiss_asv,
      Pmiss_spoof_asv] = obtain_asv_error_rates(tar_asv, non_asv, spoof_asv,
@@ -80,30 +135,30 @@ def calculate_tDCF_EER(cm_scores_file,
                                              Pfa_asv,
                                              Pmiss_asv,
                                              Pmiss_spoof_asv,
-                                             cost_model,
-                                             print_cost=False)
+                                             COST_MODEL,
+                                             print_cost=False,
+                                             det_curve=det_curve)
 
     # Minimum t-DCF
     min_tDCF_index = np.argmin(tDCF_curve)
     min_tDCF = tDCF_curve[min_tDCF_index]
 
     if printout:
+        lines = ['', 'CM SYSTEM',
+                 '\tEER\t\t= {:8.9f} % '
+                 '(Equal error rate for countermeasure)'.format(eer_cm * 100),
+                 '', 'TANDEM',
+                 '\tmin-tDCF\t\t= {:8.9f}'.format(min_tDCF),
+                 '', 'BREAKDOWN CM SYSTEM']
+        for attack_type in ATTACK_TYPES:
+            _eer = eer_cm_breakdown[attack_type] * 100
+            lines.append(
+                f'\tEER {attack_type}\t\t= {_eer:8.9f} % (Equal error rate for {attack_type}'
+            )
+        report = '\n'.join(lines) + '\n'
         with open(output_file, "w") as f_res:
-            f_res.write('\nCM SYSTEM\n')
-            f_res.write('\tEER\t\t= {:8.9f} % '
-                        '(Equal error rate for countermeasure)\n'.format(
-                            eer_cm * 100))
-
-            f_res.write('\nTANDEM\n')
-            f_res.write('\tmin-tDCF\t\t= {:8.9f}\n'.format(min_tDCF))
-
-            f_res.write('\nBREAKDOWN CM SYSTEM\n')
-            for attack_type in attack_types:
-                _eer = eer_cm_breakdown[attack_type] * 100
-                f_res.write(
-                    f'\tEER {attack_type}\t\t= {_eer:8.9f} % (Equal error rate for {attack_type}\n'
-                )
-        os.system(f"cat {output_file}")
+            f_res.write(report)
+        print(report)
 
     return eer_cm * 100, min_tDCF
 
@@ -111,14 +166,15 @@ def calculate_tDCF_EER(cm_scores_file,
 def obtain_asv_error_rates(tar_asv, non_asv, spoof_asv, asv_threshold):
 
     # False alarm and miss rates for ASV
-    Pfa_asv = sum(non_asv >= asv_threshold) / non_asv.size
-    Pmiss_asv = sum(tar_asv < asv_threshold) / tar_asv.size
+    Pfa_asv = np.count_nonzero(non_asv >= asv_threshold) / non_asv.size
+    Pmiss_asv = np.count_nonzero(tar_asv < asv_threshold) / tar_asv.size
 
     # Rate of rejecting spoofs in ASV
     if spoof_asv.size == 0:
         Pmiss_spoof_asv = None
     else:
-        Pmiss_spoof_asv = np.sum(spoof_asv < asv_threshold) / spoof_asv.size
+        Pmiss_spoof_asv = np.count_nonzero(
+            spoof_asv < asv_threshold) / spoof_asv.size
 
     return Pfa_asv, Pmiss_asv, Pmiss_spoof_asv
 
@@ -160,8 +216,259 @@ def compute_eer(target_scores, nontarget_scores):
     return eer, thresholds[min_index]
 
 
+def _eer_from_counts(tar_sums, non_sums, n_tar, n_non):
+    """EER from the cumulative target/nontarget counts of a sorted score list."""
+    if n_tar == 0 or n_non == 0:
+        return np.nan
+    frr = np.concatenate((np.atleast_1d(0), tar_sums / n_tar))
+    far = np.concatenate((np.atleast_1d(1), (n_non - non_sums) / n_non))
+    min_index = np.argmin(np.abs(frr - far))
+    return np.mean((frr[min_index], far[min_index]))
+
+
+def compute_eer_breakdown(target_scores, nontarget_scores, nontarget_groups,
+                          groups=()):
+    """Pooled EER plus one EER per nontarget group, from a single sort.
+
+    Returns (pooled EER, {group: EER}, pooled DET curve). Each group's EER
+    equals compute_eer(target_scores, nontarget_scores[nontarget_groups ==
+    group]): restricting the shared cumulative counts to the target and
+    group positions gives exactly that group's DET curve. Groups without
+    scores get NaN.
+    """
+    n_tar = target_scores.size
+    all_scores = np.concatenate((target_scores, nontarget_scores))
+    indices = np.argsort(all_scores, kind='mergesort')
+    is_tar = indices < n_tar
+    tar_sums = np.cumsum(is_tar)
+    non_sums = np.arange(1, all_scores.size + 1) - tar_sums
+
+    eer = _eer_from_counts(tar_sums, non_sums, n_tar, nontarget_scores.size)
+    frr = np.concatenate((np.atleast_1d(0), tar_sums / n_tar))
+    far = np.concatenate((np.atleast_1d(1), (nontarget_scores.size - non_sums) /
+                          nontarget_scores.size))
+    thresholds = np.concatenate(
+        (np.atleast_1d(all_scores[indices[0]] - 0.001), all_scores[indices]))
+
+    breakdown = {}
+    if len(groups):
+        # group of each sorted position ('' for targets)
+        sorted_groups = np.concatenate(
+            (np.full(n_tar, '', dtype=nontarget_groups.dtype),
+             nontarget_groups))[indices]
+        for group in groups:
+            in_group = sorted_groups == group
+            keep = in_group | is_tar
+            breakdown[group] = _eer_from_counts(
+                tar_sums[keep], np.cumsum(in_group)[keep], n_tar,
+                np.count_nonzero(in_group))
+    return eer, breakdown, (frr, far, thresholds)
+
+
+class ScoreAccumulator:
+    """Collect CM scores batch by batch and report EER / min t-DCF any time.
+
+    Scores are kept in growable typed arrays (doubled when full) together
+    with a label code (1 bona fide, 0 spoof, -1 unknown) and a source
+    code. Two options bound the memory:
+
+      bins     keep fixed-range histograms instead of raw scores; the EER
+               and t-DCF are then exact up to one bin width
+      window   keep only the most recent `window` scores (ring buffer),
+               for a rolling view of live traffic
+
+    Higher scores are taken to support the bona fide (label 1) class.
+    """
+
+    def __init__(self, bins=None, score_range=(-20.0, 20.0), window=None,
+                 capacity=1 << 14):
+        self.bins = bins
+        self.window = window
+        self.sources = []
+        self._source_codes = {}
+        self.total = 0  # scores ever added
+        if bins:
+            self.edges = np.linspace(score_range[0], score_range[1], bins + 1)
+            # one row per (label, source) pair seen
+            self._hist = {}
+        else:
+            size = window or capacity
+            self._scores = np.empty(size, dtype=np.float64)
+            self._labels = np.empty(size, dtype=np.int8)
+            self._srcs = np.empty(size, dtype=np.int16)
+            self._n = 0
+
+    def __len__(self):
+        if self.bins:
+            return int(sum(h.sum() for h in self._hist.values()))
+        return self._n
+
+    def _codes(self, sources, n):
+        if sources is None:
+            return np.full(n, -1, dtype=np.int16)
+        names, inverse = np.unique(np.asarray(sources, dtype=str),
+                                   return_inverse=True)
+        lookup = np.empty(names.size, dtype=np.int16)
+        for i, src in enumerate(names.tolist()):
+            code = self._source_codes.get(src)
+            if code is None:
+                code = self._source_codes[src] = len(self.sources)
+                self.sources.append(src)
+            lookup[i] = code
+        return lookup[inverse.ravel()]
+
+    def add(self, scores, labels=None, sources=None):
+        """Add a batch of scores with optional labels and sources.
+
+        `labels` may be ints (1/0/-1) or protocol keys ('bonafide'/'spoof').
+        """
+        scores = np.asarray(scores, dtype=np.float64).ravel()
+        n = scores.size
+        if labels is None:
+            labels = np.full(n, -1, dtype=np.int8)
+        else:
+            labels = np.asarray(labels).ravel()
+            if labels.dtype.kind == 'U':
+                labels = np.where(labels == 'bonafide', 1,
+                                  np.where(labels == 'spoof', 0, -1))
+            labels = labels.astype(np.int8)
+        codes = self._codes(sources, n)
+        self.total += n
+        if self.bins:
+            bin_idx = np.clip(np.searchsorted(self.edges, scores, 'right') - 1,
+                              0, self.bins - 1)
+            for pair in set(zip(labels.tolist(), codes.tolist())):
+                sel = (labels == pair[0]) & (codes == pair[1])
+                hist = self._hist.setdefault(pair, np.zeros(self.bins, np.int64))
+                hist += np.bincount(bin_idx[sel], minlength=self.bins)
+            return
+        if self.window:
+            # ring buffer: write position is total mod window
+            pos = (self.total - n + np.arange(n)) % self.window
+            keep = slice(max(0, n - self.window), n)
+            self._scores[pos[keep]] = scores[keep]
+            self._labels[pos[keep]] = labels[keep]
+            self._srcs[pos[keep]] = codes[keep]
+            self._n = min(self.total, self.window)
+            return
+        if self._n + n > self._scores.size:
+            size = max(self._scores.size * 2, self._n + n)
+            for name in ('_scores', '_labels', '_srcs'):
+                old = getattr(self, name)
+                grown = np.empty(size, dtype=old.dtype)
+                grown[:self._n] = old[:self._n]
+                setattr(self, name, grown)
+        self._scores[self._n:self._n + n] = scores
+        self._labels[self._n:self._n + n] = labels
+        self._srcs[self._n:self._n + n] = codes
+        self._n += n
+
+    def scores(self, label=None):
+        """Raw scores (optionally of one label); not available with bins."""
+        if self.bins:
+            raise ValueError('raw scores are not kept in histogram mode')
+        scores = self._scores[:self._n]
+        if label is None:
+            return scores
+        return scores[self._labels[:self._n] == label]
+
+    def _split(self):
+        """(bona scores, spoof scores, spoof source names) of labelled items."""
+        labels = self._labels[:self._n]
+        scores = self._scores[:self._n]
+        spoof = labels == 0
+        names = np.array(self.sources + [''])
+        return scores[labels == 1], scores[spoof], names[self._srcs[:self._n][spoof]]
+
+    def _binned_det(self):
+        bona = sum((h for (lab, _), h in self._hist.items() if lab == 1),
+                   np.zeros(self.bins, np.int64))
+        spoof = sum((h for (lab, _), h in self._hist.items() if lab == 0),
+                    np.zeros(self.bins, np.int64))
+        n_bona, n_spoof = bona.sum(), spoof.sum()
+        # thresholds at the upper bin edges: scores in bins <= i are rejected
+        frr = np.concatenate(([0], np.cumsum(bona) / max(n_bona, 1)))
+        far = np.concatenate(([1], (n_spoof - np.cumsum(spoof)) /
+                              max(n_spoof, 1)))
+        return frr, far, self.edges, n_bona, n_spoof
+
+    def eer(self):
+        """Pooled CM EER (fraction) of the labelled scores so far."""
+        if self.bins:
+            frr, far, _, n_bona, n_spoof = self._binned_det()
+            if not n_bona or not n_spoof:
+                return np.nan
+            i = np.argmin(np.abs(frr - far))
+            return np.mean((frr[i], far[i]))
+        bona, spoof, _ = self._split()
+        return _eer_from_counts(*_sorted_counts(bona, spoof),
+                                bona.size, spoof.size)
+
+    def tDCF_EER(self, asv_scores, output_file=None, printout=False):
+        """(EER %, min t-DCF) as calculate_tDCF_EER, without a score file.
+
+        `asv_scores` comes from load_asv_scores. In histogram mode the
+        per-attack breakdown is not available and `printout` is ignored.
+        """
+        if not self.bins:
+            bona, spoof, spoof_sources = self._split()
+            return compute_tDCF_EER(bona, spoof, spoof_sources, asv_scores,
+                                    output_file, printout)
+        tar_asv, non_asv, spoof_asv = asv_scores
+        asv_threshold = compute_eer(tar_asv, non_asv)[1]
+        Pfa_asv, Pmiss_asv, Pmiss_spoof_asv = obtain_asv_error_rates(
+            tar_asv, non_asv, spoof_asv, asv_threshold)
+        frr, far, edges, _, _ = self._binned_det()
+        tDCF_curve, _ = compute_tDCF(np.empty(0), np.empty(0), Pfa_asv,
+                                     Pmiss_asv, Pmiss_spoof_asv, COST_MODEL,
+                                     print_cost=False,
+                                     det_curve=(frr, far, edges))
+        return self.eer() * 100, np.min(tDCF_curve)
+
+    def calibration(self, threshold=0.5, higher_is_positive=True, n_bins=20):
+        """Summary of the (rolling) score distribution for live monitoring.
+
+        Reports the share of scores flagged at `threshold`, score
+        quantiles and a coarse histogram, plus the EER and its threshold
+        once labelled scores of both classes are present.
+        """
+        if self.bins:
+            raise ValueError('calibration needs raw scores (bins=None)')
+        scores = self._scores[:self._n]
+        view = {"count": int(self._n), "total_seen": int(self.total),
+                "threshold": threshold}
+        if not self._n:
+            return view
+        flagged = scores > threshold if higher_is_positive else scores < threshold
+        hist, edges = np.histogram(scores, bins=n_bins)
+        view.update({
+            "flagged_rate": float(np.mean(flagged)),
+            "mean": float(scores.mean()),
+            "quantiles": {f"p{q}": float(v) for q, v in zip(
+                (1, 5, 25, 50, 75, 95, 99),
+                np.percentile(scores, (1, 5, 25, 50, 75, 95, 99)))},
+            "histogram": {"edges": edges.round(6).tolist(),
+                          "counts": hist.tolist()},
+        })
+        bona, spoof, _ = self._split()
+        view["labelled"] = int(bona.size + spoof.size)
+        if bona.size and spoof.size:
+            eer, eer_threshold = compute_eer(bona, spoof)
+            view["eer"] = float(eer)
+            view["eer_threshold"] = float(eer_threshold)
+        return view
+
+
+def _sorted_counts(target_scores, nontarget_scores):
+    """Cumulative target / nontarget counts along the sorted pooled scores."""
+    indices = np.argsort(np.concatenate((target_scores, nontarget_scores)),
+                         kind='mergesort')
+    tar_sums = np.cumsum(indices < target_scores.size)
+    return tar_sums, np.arange(1, indices.size + 1) - tar_sums
+
+
 def compute_tDCF(bonafide_score_cm, spoof_score_cm, Pfa_asv, Pmiss_asv,
-                 Pmiss_spoof_asv, cost_model, print_cost):
+                 Pmiss_spoof_asv, cost_model, print_cost, det_curve=None):
     """
     Compute Tandem Detection Cost Function (t-DCF) [1] for a fixed ASV system.
     In brief, t-DCF returns a detection cost of a cascaded system of this form,
@@ -209,6 +516,9 @@ def compute_tDCF(bonafide_score_cm, spoof_score_cm, Pfa_asv, Pmiss_asv,
 
       print_cost          Print a summary of the cost parameters and the
                           implied t-DCF cost function?
+      det_curve           Optional (Pmiss_cm, Pfa_cm, thresholds) already
+                          computed for these scores, e.g. by
+                          compute_eer_breakdown, to avoid sorting again.
 
     OUTPUTS:
 
@@ -266,16 +576,18 @@ def compute_tDCF(bonafide_score_cm, spoof_score_cm, Pfa_asv, Pmiss_asv,
     if np.isnan(combined_scores).any() or np.isinf(combined_scores).any():
         sys.exit('ERROR: Your scores contain nan or inf.')
 
-    # Sanity check that inputs are scores and not decisions
-    n_uniq = np.unique(combined_scores).size
+    # Obtain miss and false alarm rates of CM
+    if det_curve is None:
+        det_curve = compute_det_curve(bonafide_score_cm, spoof_score_cm)
+    Pmiss_cm, Pfa_cm, CM_thresholds = det_curve
+
+    # Sanity check that inputs are scores and not decisions (the DET
+    # thresholds after the first are the sorted scores)
+    n_uniq = 1 + np.count_nonzero(np.diff(CM_thresholds[1:]))
     if n_uniq < 3:
         sys.exit(
             'ERROR: You should provide soft CM scores - not binary decisions')
 
-    # Obtain miss and false alarm rates of CM
-    Pmiss_cm, Pfa_cm, CM_thresholds = compute_det_curve(
-        bonafide_score_cm, spoof_score_cm)
-
     # Constants - see ASVspoof 2019 evaluation plan
     C1 = cost_model['Ptar'] * (cost_model['Cmiss_cm'] - cost_model['Cmiss_asv'] * Pmiss_asv) - \
         cost_model['Pnon'] * cost_model['Cfa_asv'] * Pfa_asv
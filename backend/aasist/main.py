@@ -7,9 +7,11 @@ Copyright (c) 2021-present NAVER Corp.
 MIT license
 """
 import argparse
+import contextlib
 import json
 import os
 import sys
+import time
 import warnings
 from importlib import import_module
 from pathlib import Path
@@ -18,14 +20,19 @@ from typing import Dict, List, Union
 
 import torch
 import torch.nn as nn
+from torch.nn.parallel import DistributedDataParallel
 from torch.utils.data import DataLoader
+from torch.utils.data.distributed import DistributedSampler
 from torch.utils.tensorboard import SummaryWriter
 from torchcontrib.optim import SWA
 
-from data_utils import (Dataset_ASVspoof2019_train,
-                        Dataset_ASVspoof2019_devNeval, genSpoof_list)
-from evaluation import calculate_tDCF_EER
-from utils import create_optimizer, seed_worker, set_seed, str_to_bool
+from data_utils import (DecodedCache, Dataset_ASVspoof2019_train,
+                        Dataset_ASVspoof2019_devNeval, PadCollate,
+                        genSpoof_list)
+from evaluation import ScoreAccumulator, load_asv_scores
+from utils import (configure_threads, create_optimizer,
+                   enable_activation_checkpointing, seed_worker, set_seed,
+                   setup_distributed, str_to_bool)
 
 warnings.filterwarnings("ignore", category=FutureWarning)
 
@@ -41,12 +48,31 @@ def main(args: argparse.Namespace) -> None:
     model_config = config["model_config"]
     optim_config = config["optim_config"]
     optim_config["epochs"] = config["num_epochs"]
+    optim_config["grad_accum_steps"] = int(config.get("grad_accum_steps", 1))
     track = config["track"]
     assert track in ["LA", "PA", "DF"], "Invalid track given"
     if "eval_all_best" not in config:
         config["eval_all_best"] = "True"
     if "freq_aug" not in config:
         config["freq_aug"] = "False"
+    if args.num_workers is not None:
+        config["num_workers"] = args.num_workers
+    if args.cache_dir is not None:
+        config["cache_dir"] = args.cache_dir
+    if args.threads is not None:
+        config["num_threads"] = args.threads
+    if args.interop_threads is not None:
+        config["num_interop_threads"] = args.interop_threads
+
+    # set device; torchrun launches one process per rank (gloo on CPU)
+    device = args.device or ("cuda" if torch.cuda.is_available() else "cpu")
+    rank, local_rank, world_size = setup_distributed(
+        device, int(config.get("dist_timeout_min", 120)))
+    is_main = rank == 0
+    if device == "cuda" and world_size > 1:
+        torch.cuda.set_device(local_rank)
+    n_threads, n_interop = configure_threads(
+        config.get("num_threads"), config.get("num_interop_threads"))
 
     # make experiment reproducible
     set_seed(args.seed, config)
@@ -63,6 +89,9 @@ def main(args: argparse.Namespace) -> None:
         "ASVspoof2019_{}_cm_protocols/{}.cm.eval.trl.txt".format(
             track, prefix_2019))
 
+    # organizers' ASV scores, parsed once for every t-DCF computation
+    asv_scores = load_asv_scores(database_path / config["asv_score_path"])
+
     # define model related paths
     model_tag = "{}_{}_ep{}_bs{}".format(
         track,
@@ -73,43 +102,61 @@ def main(args: argparse.Namespace) -> None:
     model_tag = output_dir / model_tag
     model_save_path = model_tag / "weights"
     eval_score_path = model_tag / config["eval_output"]
-    writer = SummaryWriter(model_tag)
-    os.makedirs(model_save_path, exist_ok=True)
-    copy(args.config, model_tag / "config.conf")
-
-    # set device
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    print("Device: {}".format(device))
-    if device == "cpu":
-        raise ValueError("GPU not detected!")
-
-    # define model architecture
-    model = get_model(model_config, device)
+    if is_main:
+        writer = SummaryWriter(model_tag)
+        os.makedirs(model_save_path, exist_ok=True)
+        copy(args.config, model_tag / "config.conf")
+
+    print("Device: {}, rank {}/{}, {} intra-op / {} inter-op threads".format(
+        device, rank, world_size, n_threads, n_interop))
+
+    # define model architecture; `net` is the unwrapped model used for
+    # evaluation and checkpoints, `model` the (possibly DDP) training view
+    net = get_model(model_config, device)
+    if str_to_bool(str(config.get("activation_checkpointing", "False"))):
+        n_wrapped = enable_activation_checkpointing(net)
+        print("Activation checkpointing on {} graph-attention blocks".format(
+            n_wrapped))
+    model = net
+    if world_size > 1:
+        model = DistributedDataParallel(
+            net, device_ids=[local_rank] if device == "cuda" else None)
+
+    # evaluation, logging and checkpoints happen on rank 0 only
+    if args.eval and not is_main:
+        sys.exit(0)
 
-    # define dataloaders
+    # define dataloaders; only the splits this process uses are loaded (and
+    # get a decoded cache): eval only with --eval, train only on ranks > 0
+    if args.eval:
+        splits = ("eval",)
+    elif is_main:
+        splits = ("train", "dev", "eval")
+    else:
+        splits = ("train",)
     trn_loader, dev_loader, eval_loader = get_loader(
-        database_path, args.seed, config)
+        database_path, args.seed, config, distributed=world_size > 1,
+        splits=splits)
 
     # evaluates pretrained model and exit script
     if args.eval:
-        model.load_state_dict(
+        net.load_state_dict(
             torch.load(config["model_path"], map_location=device))
         print("Model loaded : {}".format(config["model_path"]))
         print("Start evaluation...")
-        produce_evaluation_file(eval_loader, model, device,
-                                eval_score_path, eval_trial_path)
-        calculate_tDCF_EER(cm_scores_file=eval_score_path,
-                           asv_score_file=database_path /
-                           config["asv_score_path"],
-                           output_file=model_tag / "t-DCF_EER.txt")
+        eval_scores = produce_evaluation_file(eval_loader, net, device,
+                                              eval_score_path, eval_trial_path)
+        eval_scores.tDCF_EER(asv_scores, output_file=model_tag / "t-DCF_EER.txt",
+                             printout=True)
         print("DONE.")
-        eval_eer, eval_tdcf = calculate_tDCF_EER(
-            cm_scores_file=eval_score_path,
-            asv_score_file=database_path / config["asv_score_path"],
-            output_file=model_tag/"loaded_model_t-DCF_EER.txt")
+        eval_eer, eval_tdcf = eval_scores.tDCF_EER(
+            asv_scores,
+            output_file=model_tag/"loaded_model_t-DCF_EER.txt",
+            printout=True)
         sys.exit(0)
 
-    # get optimizer and scheduler
+    # get optimizer and scheduler (step-based schedulers count optimizer
+    # steps, i.e. batches / grad_accum_steps)
     optim_config["steps_per_epoch"] = len(trn_loader)
     optimizer, scheduler = create_optimizer(model.parameters(), optim_config)
     optimizer_swa = SWA(optimizer)
@@ -119,23 +166,34 @@ def main(args: argparse.Namespace) -> None:
     best_dev_tdcf = 0.05
     best_eval_tdcf = 1.
     n_swa_update = 0  # number of snapshots of model to use in SWA
-    f_log = open(model_tag / "metric_log.txt", "a")
-    f_log.write("=" * 5 + "\n")
-
-    # make directory for metric logging
     metric_path = model_tag / "metrics"
-    os.makedirs(metric_path, exist_ok=True)
+    if is_main:
+        f_log = open(model_tag / "metric_log.txt", "a")
+        f_log.write("=" * 5 + "\n")
+
+        # make directory for metric logging
+        os.makedirs(metric_path, exist_ok=True)
 
     # Training
     for epoch in range(config["num_epochs"]):
         print("Start training epoch{:03d}".format(epoch))
+        if world_size > 1:
+            trn_loader.sampler.set_epoch(epoch)
+        start = time.perf_counter()
         running_loss = train_epoch(trn_loader, model, optimizer, device,
                                    scheduler, config)
-        produce_evaluation_file(dev_loader, model, device,
-                                metric_path/"dev_score.txt", dev_trial_path)
-        dev_eer, dev_tdcf = calculate_tDCF_EER(
-            cm_scores_file=metric_path/"dev_score.txt",
-            asv_score_file=database_path/config["asv_score_path"],
+        throughput = (len(trn_loader) * config["batch_size"] * world_size /
+                      (time.perf_counter() - start))
+        print("Throughput: {:.1f} samples/sec ({} proc x {} threads)".format(
+            throughput, world_size, n_threads))
+        if not is_main:
+            continue
+        writer.add_scalar("train_samples_per_sec", throughput, epoch)
+        dev_scores = produce_evaluation_file(dev_loader, net, device,
+                                             metric_path/"dev_score.txt",
+                                             dev_trial_path)
+        dev_eer, dev_tdcf = dev_scores.tDCF_EER(
+            asv_scores,
             output_file=metric_path/"dev_t-DCF_EER_{}epo.txt".format(epoch),
             printout=False)
         print("DONE.\nLoss:{:.5f}, dev_eer: {:.3f}, dev_tdcf:{:.5f}".format(
@@ -148,18 +206,19 @@ def main(args: argparse.Namespace) -> None:
         if best_dev_eer >= dev_eer:
             print("best model find at epoch", epoch)
             best_dev_eer = dev_eer
-            torch.save(model.state_dict(),
+            torch.save(net.state_dict(),
                        model_save_path / "epoch_{}_{:03.3f}.pth".format(epoch, dev_eer))
 
             # do evaluation whenever best model is renewed
             if str_to_bool(config["eval_all_best"]):
-                produce_evaluation_file(eval_loader, model, device,
-                                        eval_score_path, eval_trial_path)
-                eval_eer, eval_tdcf = calculate_tDCF_EER(
-                    cm_scores_file=eval_score_path,
-                    asv_score_file=database_path / config["asv_score_path"],
+                eval_scores = produce_evaluation_file(
+                    eval_loader, net, device, eval_score_path,
+                    eval_trial_path)
+                eval_eer, eval_tdcf = eval_scores.tDCF_EER(
+                    asv_scores,
                     output_file=metric_path /
-                    "t-DCF_EER_{:03d}epo.txt".format(epoch))
+                    "t-DCF_EER_{:03d}epo.txt".format(epoch),
+                    printout=True)
 
                 log_text = "epoch{:03d}, ".format(epoch)
                 if eval_eer < best_eval_eer:
@@ -168,7 +227,7 @@ def main(args: argparse.Namespace) -> None:
                 if eval_tdcf < best_eval_tdcf:
                     log_text += "best tdcf, {:.4f}".format(eval_tdcf)
                     best_eval_tdcf = eval_tdcf
-                    torch.save(model.state_dict(),
+                    torch.save(net.state_dict(),
                                model_save_path / "best.pth")
                 if len(log_text) > 0:
                     print(log_text)
@@ -180,33 +239,37 @@ def main(args: argparse.Namespace) -> None:
         writer.add_scalar("best_dev_eer", best_dev_eer, epoch)
         writer.add_scalar("best_dev_tdcf", best_dev_tdcf, epoch)
 
+    if not is_main:
+        torch.distributed.destroy_process_group()
+        return
+
     print("Start final evaluation")
     epoch += 1
     if n_swa_update > 0:
         optimizer_swa.swap_swa_sgd()
-        optimizer_swa.bn_update(trn_loader, model, device=device)
-    produce_evaluation_file(eval_loader, model, device, eval_score_path,
-                            eval_trial_path)
-    eval_eer, eval_tdcf = calculate_tDCF_EER(cm_scores_file=eval_score_path,
-                                             asv_score_file=database_path /
-                                             config["asv_score_path"],
-                                             output_file=model_tag / "t-DCF_EER.txt")
+        optimizer_swa.bn_update(trn_loader, net, device=device)
+    eval_scores = produce_evaluation_file(eval_loader, net, device,
+                                          eval_score_path, eval_trial_path)
+    eval_eer, eval_tdcf = eval_scores.tDCF_EER(
+        asv_scores, output_file=model_tag / "t-DCF_EER.txt", printout=True)
     f_log = open(model_tag / "metric_log.txt", "a")
     f_log.write("=" * 5 + "\n")
     f_log.write("EER: {:.3f}, min t-DCF: {:.5f}".format(eval_eer, eval_tdcf))
     f_log.close()
 
-    torch.save(model.state_dict(),
+    torch.save(net.state_dict(),
                model_save_path / "swa.pth")
 
     if eval_eer <= best_eval_eer:
         best_eval_eer = eval_eer
     if eval_tdcf <= best_eval_tdcf:
         best_eval_tdcf = eval_tdcf
-        torch.save(model.state_dict(),
+        torch.save(net.state_dict(),
                    model_save_path / "best.pth")
     print("Exp FIN. EER: {:.3f}, min t-DCF: {:.5f}".format(
         best_eval_eer, best_eval_tdcf))
+    if world_size > 1:
+        torch.distributed.destroy_process_group()
 
 
 def get_model(model_config: Dict, device: torch.device):
@@ -220,11 +283,35 @@ def get_model(model_config: Dict, device: torch.device):
     return model
 
 
+def get_loader_kwargs(config: dict) -> Dict:
+    """DataLoader worker settings from the config.
+
+    "num_workers" (default: up to 8 cores) decodes batches in parallel,
+    "persistent_workers" keeps them alive across epochs and
+    "prefetch_factor" sets how many batches each worker prepares ahead.
+    """
+    num_workers = int(config.get("num_workers", min(8, os.cpu_count() or 1)))
+    kwargs = {"num_workers": num_workers}
+    if num_workers > 0:
+        kwargs["persistent_workers"] = str_to_bool(
+            str(config.get("persistent_workers", "True")))
+        kwargs["prefetch_factor"] = int(config.get("prefetch_factor", 2))
+    return kwargs
+
+
 def get_loader(
         database_path: str,
         seed: int,
-        config: dict) -> List[torch.utils.data.DataLoader]:
-    """Make PyTorch DataLoaders for train / developement / evaluation"""
+        config: dict,
+        distributed: bool = False,
+        splits=("train", "dev", "eval")) -> List[torch.utils.data.DataLoader]:
+    """Make PyTorch DataLoaders for train / developement / evaluation
+
+    With `distributed`, each rank trains on its own DistributedSampler
+    slice; dev/eval loaders stay whole (they are only used on rank 0).
+    Splits not in `splits` are neither listed nor cached; their loader is
+    None.
+    """
     track = config["track"]
     prefix_2019 = "ASVspoof2019.{}".format(track)
 
@@ -243,47 +330,100 @@ def get_loader(
         "ASVspoof2019_{}_cm_protocols/{}.cm.eval.trl.txt".format(
             track, prefix_2019))
 
-    d_label_trn, file_train = genSpoof_list(dir_meta=trn_list_path,
-                                            is_train=True,
-                                            is_eval=False)
-    print("no. training files:", len(file_train))
-
-    train_set = Dataset_ASVspoof2019_train(list_IDs=file_train,
-                                           labels=d_label_trn,
-                                           base_dir=trn_database_path)
-    gen = torch.Generator()
-    gen.manual_seed(seed)
-    trn_loader = DataLoader(train_set,
-                            batch_size=config["batch_size"],
-                            shuffle=True,
-                            drop_last=True,
-                            pin_memory=True,
-                            worker_init_fn=seed_worker,
-                            generator=gen)
-
-    _, file_dev = genSpoof_list(dir_meta=dev_trial_path,
-                                is_train=False,
-                                is_eval=False)
-    print("no. validation files:", len(file_dev))
-
-    dev_set = Dataset_ASVspoof2019_devNeval(list_IDs=file_dev,
-                                            base_dir=dev_database_path)
-    dev_loader = DataLoader(dev_set,
-                            batch_size=config["batch_size"],
-                            shuffle=False,
-                            drop_last=False,
-                            pin_memory=True)
-
-    file_eval = genSpoof_list(dir_meta=eval_trial_path,
-                              is_train=False,
-                              is_eval=True)
-    eval_set = Dataset_ASVspoof2019_devNeval(list_IDs=file_eval,
-                                             base_dir=eval_database_path)
-    eval_loader = DataLoader(eval_set,
-                             batch_size=config["batch_size"],
-                             shuffle=False,
-                             drop_last=False,
-                             pin_memory=True)
+    loader_kwargs = get_loader_kwargs(config)
+    # items are returned unpadded and each batch is padded into one buffer
+    loader_kwargs["collate_fn"] = PadCollate(max_len=64600)
+
+    def cache_for(split, file_list, base_dir, shared=False):
+        # optional decoded cache: one memmapped file per split, built once
+        if not config.get("cache_dir"):
+            return None
+
+        def open_or_build():
+            return DecodedCache.open_or_build(
+                Path(config["cache_dir"]) / "{}_{}".format(track, split),
+                file_list, base_dir,
+                dtype=config.get("cache_dtype", "int16"),
+                num_workers=loader_kwargs["num_workers"])
+
+        if not (shared and distributed):
+            return open_or_build()
+        # every rank opens this cache: rank 0 builds it, then each other
+        # host's local rank 0 (a no-op on shared storage), then the rest
+        # only open it, so no two processes ever write the same files
+        import torch.distributed as dist
+        local_rank = int(os.environ.get("LOCAL_RANK", "0"))
+        cache = None
+        if dist.get_rank() == 0:
+            cache = open_or_build()
+        dist.barrier()
+        if cache is None and local_rank == 0:
+            cache = open_or_build()
+        dist.barrier()
+        return cache if cache is not None else open_or_build()
+
+    trn_loader = dev_loader = eval_loader = None
+    if "train" in splits:
+        d_label_trn, file_train = genSpoof_list(dir_meta=trn_list_path,
+                                                is_train=True,
+                                                is_eval=False)
+        print("no. training files:", len(file_train))
+
+        train_set = Dataset_ASVspoof2019_train(
+            list_IDs=file_train,
+            labels=d_label_trn,
+            base_dir=trn_database_path,
+            cache=cache_for("train", file_train, trn_database_path,
+                            shared=True),
+            pad=False)
+        gen = torch.Generator()
+        gen.manual_seed(seed)
+        trn_sampler = None
+        if distributed:
+            trn_sampler = DistributedSampler(train_set, seed=seed, drop_last=True)
+        trn_loader = DataLoader(train_set,
+                                batch_size=config["batch_size"],
+                                shuffle=trn_sampler is None,
+                                sampler=trn_sampler,
+                                drop_last=True,
+                                pin_memory=torch.cuda.is_available(),
+                                worker_init_fn=seed_worker,
+                                generator=gen,
+                                **loader_kwargs)
+
+    if "dev" in splits:
+        _, file_dev = genSpoof_list(dir_meta=dev_trial_path,
+                                    is_train=False,
+                                    is_eval=False)
+        print("no. validation files:", len(file_dev))
+
+        dev_set = Dataset_ASVspoof2019_devNeval(
+            list_IDs=file_dev,
+            base_dir=dev_database_path,
+            cache=cache_for("dev", file_dev, dev_database_path),
+            pad=False)
+        dev_loader = DataLoader(dev_set,
+                                batch_size=config["batch_size"],
+                                shuffle=False,
+                                drop_last=False,
+                                pin_memory=torch.cuda.is_available(),
+                                **loader_kwargs)
+
+    if "eval" in splits:
+        file_eval = genSpoof_list(dir_meta=eval_trial_path,
+                                  is_train=False,
+                                  is_eval=True)
+        eval_set = Dataset_ASVspoof2019_devNeval(
+            list_IDs=file_eval,
+            base_dir=eval_database_path,
+            cache=cache_for("eval", file_eval, eval_database_path),
+            pad=False)
+        eval_loader = DataLoader(eval_set,
+                                 batch_size=config["batch_size"],
+                                 shuffle=False,
+                                 drop_last=False,
+                                 pin_memory=torch.cuda.is_available(),
+                                 **loader_kwargs)
 
     return trn_loader, dev_loader, eval_loader
 
@@ -293,29 +433,40 @@ def produce_evaluation_file(
     model,
     device: torch.device,
     save_path: str,
-    trial_path: str) -> None:
-    """Perform evaluation and save the score to a file"""
+    trial_path: str) -> ScoreAccumulator:
+    """Perform evaluation, save the score to a file and return the scores
+
+    The returned accumulator reports EER / t-DCF directly, without
+    re-reading the score file.
+    """
     model.eval()
     with open(trial_path, "r") as f_trl:
-        trial_lines = f_trl.readlines()
+        trials = [line.strip().split(' ') for line in f_trl]
+    scores = ScoreAccumulator(capacity=len(trials))
     fname_list = []
-    score_list = []
+    start = time.perf_counter()
     for batch_x, utt_id in data_loader:
         batch_x = batch_x.to(device)
         with torch.no_grad():
             _, batch_out = model(batch_x)
             batch_score = (batch_out[:, 1]).data.cpu().numpy().ravel()
         # add outputs
+        batch_trials = trials[len(fname_list):len(fname_list) + len(utt_id)]
         fname_list.extend(utt_id)
-        score_list.extend(batch_score.tolist())
+        scores.add(batch_score,
+                   labels=[trl[4] for trl in batch_trials],
+                   sources=[trl[3] for trl in batch_trials])
 
-    assert len(trial_lines) == len(fname_list) == len(score_list)
+    assert len(trials) == len(fname_list) == len(scores)
+    print("Scored {} trials at {:.1f} samples/sec".format(
+        len(scores), len(scores) / (time.perf_counter() - start)))
     with open(save_path, "w") as fh:
-        for fn, sco, trl in zip(fname_list, score_list, trial_lines):
-            _, utt_id, _, src, key = trl.strip().split(' ')
+        for fn, sco, trl in zip(fname_list, scores.scores().tolist(), trials):
+            _, utt_id, _, src, key = trl
             assert fn == utt_id
             fh.write("{} {} {} {}\n".format(utt_id, src, key, sco))
     print("Scores saved to {}".format(save_path))
+    return scores
 
 
 def train_epoch(
@@ -325,27 +476,50 @@ def train_epoch(
     device: torch.device,
     scheduler: torch.optim.lr_scheduler,
     config: argparse.Namespace):
-    """Train the model for one epoch"""
+    """Train the model for one epoch
+
+    With "grad_accum_steps" N, gradients of N consecutive batches are
+    summed before each optimizer (and step-based scheduler) step; with
+    "mixed_precision": "bf16" the forward pass runs under bfloat16 autocast.
+    """
     running_loss = 0
     num_total = 0.0
     ii = 0
     model.train()
+    accum = max(1, int(config.get("grad_accum_steps", 1)))
+    n_batches = len(trn_loader)
+    autocast = torch.autocast(
+        device_type=str(device).split(":")[0], dtype=torch.bfloat16,
+        enabled=config.get("mixed_precision", "fp32") == "bf16")
 
     # set objective (Loss) functions
     weight = torch.FloatTensor([0.1, 0.9]).to(device)
     criterion = nn.CrossEntropyLoss(weight=weight)
+    optim.zero_grad()
     for batch_x, batch_y in trn_loader:
         batch_size = batch_x.size(0)
         num_total += batch_size
+        # micro-batches in this accumulation group (the last may be short)
+        group_start = ii - ii % accum
+        group_len = min(accum, n_batches - group_start)
+        is_step = ii == group_start + group_len - 1
         ii += 1
         batch_x = batch_x.to(device)
         batch_y = batch_y.view(-1).type(torch.int64).to(device)
-        _, batch_out = model(batch_x, Freq_aug=str_to_bool(config["freq_aug"]))
-        batch_loss = criterion(batch_out, batch_y)
+        # DDP only needs to all-reduce on the micro-batch that steps
+        sync = (model.no_sync() if hasattr(model, "no_sync") and not is_step
+                else contextlib.nullcontext())
+        with sync:
+            with autocast:
+                _, batch_out = model(batch_x,
+                                     Freq_aug=str_to_bool(config["freq_aug"]))
+            batch_loss = criterion(batch_out.float(), batch_y)
+            (batch_loss / group_len).backward()
         running_loss += batch_loss.item() * batch_size
-        optim.zero_grad()
-        batch_loss.backward()
+        if not is_step:
+            continue
         optim.step()
+        optim.zero_grad()
 
         if config["optim_config"]["scheduler"] in ["cosine", "keras_decay"]:
             scheduler.step()
@@ -388,4 +562,25 @@ if __name__ == "__main__":
                         type=str,
                         default=None,
                         help="directory to the model weight file (can be also given in the config file)")
+    parser.add_argument("--num_workers",
+                        type=int,
+                        default=None,
+                        help="DataLoader workers (overrides config \"num_workers\")")
+    parser.add_argument("--device",
+                        type=str,
+                        default=None,
+                        choices=["cpu", "cuda"],
+                        help="default: cuda if available, else cpu")
+    parser.add_argument("--threads",
+                        type=int,
+                        default=None,
+                        help="torch intra-op threads (config \"num_threads\")")
+    parser.add_argument("--interop_threads",
+                        type=int,
+                        default=None,
+                        help="torch inter-op threads (config \"num_interop_threads\")")
+    parser.add_argument("--cache_dir",
+                        type=str,
+                        default=None,
+                        help="directory for decoded memmap caches of each split")
     main(parser.parse_args())
@@ -0,0 +1,82 @@
+"""
+Pack one ASVspoof2019 split into a single memory-mapped corpus.
+
+Writes <output>.bin (all samples back to back), <output>.idx.npz (key,
+offset, length and label per utterance) and <output>.json (metadata), to be
+read with data_utils.Dataset_ASVspoof2019_packed.
+
+Usage:
+    python pack_dataset.py --database_path ./LA --split train --output ./packed/LA_train
+"""
+import argparse
+from pathlib import Path
+
+from data_utils import CACHE_DTYPES, DecodedCache, genSpoof_list
+
+
+def split_paths(database_path, track, split):
+    """Audio directory and protocol file of a split, laid out as in main.py."""
+    prefix_2019 = "ASVspoof2019.{}".format(track)
+    protocol = {"train": "train.trn", "dev": "dev.trl", "eval": "eval.trl"}[split]
+    base_dir = database_path / "ASVspoof2019_{}_{}/".format(track, split)
+    protocol_path = (database_path /
+                     "ASVspoof2019_{}_cm_protocols/{}.cm.{}.txt".format(
+                         track, prefix_2019, protocol))
+    return base_dir, protocol_path
+
+
+def main(args):
+    database_path = Path(args.database_path)
+    base_dir, protocol_path = split_paths(database_path, args.track, args.split)
+    base_dir = Path(args.base_dir or base_dir)
+    protocol_path = Path(args.protocol or protocol_path)
+
+    if args.no_labels:
+        labels = None
+        file_list = genSpoof_list(dir_meta=protocol_path, is_train=False,
+                                  is_eval=True)
+    else:
+        labels, file_list = genSpoof_list(dir_meta=protocol_path,
+                                          is_train=args.split == "train",
+                                          is_eval=False)
+    print("Packing {} files from {}".format(len(file_list), base_dir))
+
+    metadata = {
+        "track": args.track,
+        "split": args.split,
+        "protocol": str(protocol_path),
+        "base_dir": str(base_dir),
+    }
+    if labels is not None:
+        metadata["bonafide"] = sum(labels.values())
+        metadata["spoof"] = len(labels) - metadata["bonafide"]
+    corpus = DecodedCache.build(args.output, file_list, base_dir,
+                                dtype=args.dtype, num_workers=args.workers,
+                                labels=labels, metadata=metadata)
+    print("Wrote {} ({} utterances, {} samples)".format(
+        DecodedCache.data_path(args.output), len(corpus),
+        corpus.metadata["total_samples"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack an ASVspoof split")
+    parser.add_argument("--database_path", type=str, default="./LA/",
+                        help="ASVspoof2019 root (as \"database_path\" in the config)")
+    parser.add_argument("--track", type=str, default="LA",
+                        choices=["LA", "PA", "DF"])
+    parser.add_argument("--split", type=str, required=True,
+                        choices=["train", "dev", "eval"])
+    parser.add_argument("--output", type=str, required=True,
+                        help="output prefix (writes .bin, .idx.npz and .json)")
+    parser.add_argument("--dtype", type=str, default="int16",
+                        choices=list(CACHE_DTYPES),
+                        help="sample type; float32 is served without conversion")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="processes decoding FLAC files")
+    parser.add_argument("--protocol", type=str, default=None,
+                        help="protocol file (default: derived from --split)")
+    parser.add_argument("--base_dir", type=str, default=None,
+                        help="directory holding flac/ (default: derived from --split)")
+    parser.add_argument("--no_labels", action="store_true",
+                        help="protocol has no label column")
+    main(parser.parse_args())
@@ -2,9 +2,11 @@
 Utilization functions
 """
 
+import math
 import os
 import random
 import sys
+from datetime import timedelta
 
 import numpy as np
 import torch
@@ -107,7 +109,7 @@ def _get_scheduler(optimizer, optim_config):
 
     elif optim_config['scheduler'] == 'cosine':
         total_steps = optim_config['epochs'] * \
-            optim_config['steps_per_epoch']
+            optimizer_steps_per_epoch(optim_config)
 
         scheduler = torch.optim.lr_scheduler.LambdaLR(
             optimizer,
@@ -125,6 +127,12 @@ def _get_scheduler(optimizer, optim_config):
     return scheduler
 
 
+def optimizer_steps_per_epoch(optim_config):
+    """Optimizer steps per epoch: batches grouped by 'grad_accum_steps'"""
+    accum = max(1, int(optim_config.get('grad_accum_steps', 1)))
+    return math.ceil(optim_config['steps_per_epoch'] / accum)
+
+
 def create_optimizer(model_parameters, optim_config):
     """Defines an optimizer and a scheduler"""
     optimizer = _get_optimizer(model_parameters, optim_config)
@@ -155,3 +163,63 @@ def set_seed(seed, config = None):
         torch.cuda.manual_seed_all(seed)
         torch.backends.cudnn.deterministic = str_to_bool(config["cudnn_deterministic_toggle"])
         torch.backends.cudnn.benchmark = str_to_bool(config["cudnn_benchmark_toggle"])
+
+
+def configure_threads(num_threads=None, num_interop_threads=None):
+    """Set torch intra-op / inter-op thread pools (None keeps the default).
+
+    Must run before the first parallel op, as the inter-op pool cannot be
+    resized once it has started.
+    """
+    if num_interop_threads:
+        torch.set_num_interop_threads(int(num_interop_threads))
+    if num_threads:
+        torch.set_num_threads(int(num_threads))
+    return torch.get_num_threads(), torch.get_num_interop_threads()
+
+
+def setup_distributed(device, timeout_min=120):
+    """Join the process group when launched by torchrun (WORLD_SIZE > 1).
+
+    Uses gloo on CPU and nccl on GPU. Returns (rank, local_rank,
+    world_size); (0, 0, 1) for a plain single-process run.
+    """
+    world_size = int(os.environ.get("WORLD_SIZE", "1"))
+    if world_size <= 1:
+        return 0, 0, 1
+    import torch.distributed as dist
+
+    dist.init_process_group(
+        backend="nccl" if device == "cuda" else "gloo",
+        timeout=timedelta(minutes=timeout_min))
+    return dist.get_rank(), int(os.environ.get("LOCAL_RANK", "0")), world_size
+
+
+GRAPH_ATTENTION_BLOCKS = ("GraphAttentionLayer", "HtrgGraphAttentionLayer")
+
+
+def enable_activation_checkpointing(model, block_names=GRAPH_ATTENTION_BLOCKS):
+    """Recompute the activations of matching blocks during backward.
+
+    Every submodule whose class name is in `block_names` (AASIST's
+    graph-attention layers by default) has its forward wrapped in
+    torch.utils.checkpoint while training, trading compute for memory.
+    Returns the number of wrapped blocks.
+    """
+    from torch.utils.checkpoint import checkpoint
+
+    def wrap(module):
+        forward = module.forward
+
+        def checkpointed(*args, **kwargs):
+            if module.training and torch.is_grad_enabled():
+                return checkpoint(forward, *args, use_reentrant=False, **kwargs)
+            return forward(*args, **kwargs)
+        module.forward = checkpointed
+
+    blocks = [m for m in model.modules() if type(m).__name__ in block_names]
+    for block in blocks:
+        wrap(block)
+    if not blocks:
+        print("WARNING: no {} blocks found to checkpoint".format(block_names))
+    return len(blocks)
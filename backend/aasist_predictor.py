@@ -1,51 +1,644 @@
-import pathlib, torch, torchaudio, numpy as np, json
+import io, os, math, logging, pathlib, threading, time, torch, torchaudio, numpy as np, json
+import functools
+from collections import defaultdict
+import soundfile as sf
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Iterable, Union
+
+# Per-stage timing hooks (decode / resample / forward), shared with app.py
+# and reusable by batch tools via aasist_predictor.stage_timer
+from metrics import STAGE_SECONDS, stage_timer  # noqa: F401
+# Sampled torch.profiler / cProfile capture (off unless AASIST_PROFILE_RATE > 0)
+from profiling import profiler
+
+logger = logging.getLogger(__name__)
+
+AudioSource = Union[str, pathlib.Path, bytes, bytearray, memoryview, BinaryIO]
 
 _THIS_DIR = pathlib.Path(__file__).resolve().parent
 _AASIST_DIR = _THIS_DIR / "aasist"
 _CONFIG_PATH = _AASIST_DIR / "config/AASIST.conf"
 _WEIGHTS_PATH = _AASIST_DIR / "models/weights/AASIST.pth"
+_ONNX_PATH = pathlib.Path(os.getenv("AASIST_ONNX_PATH",
+                                    _AASIST_DIR / "models/weights/AASIST.onnx"))
 
-# Lazy import of the upstream model (keeps local namespace clean)
 import sys
 sys.path.append(str(_AASIST_DIR))
-from models.AASIST import Model as AASISTModel  # type: ignore
 
 _DEVICE = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
 
 # ---------------------------------------------------------------
-# Load configuration & model once at module import time.
-# This ensures subsequent predict() calls are fast.
+# Only the (small) configuration is read at import time. The model is
+# loaded on first use, or up front via load_model()/warmup(), so tools
+# that import this module without scoring anything start quickly.
+# AASIST_BACKEND=onnx serves an exported graph (see export_onnx.py) with
+# ONNX Runtime instead and skips building the torch model. Only the model
+# runtime changes: torch/torchaudio are still imported for preprocessing.
 # ---------------------------------------------------------------
 with open(_CONFIG_PATH, 'r') as f:
     _cfg = json.load(f)
-_model = AASISTModel(_cfg["model_config"]).to(_DEVICE)
-_state = torch.load(_WEIGHTS_PATH, map_location=_DEVICE)
-_model.load_state_dict(_state)
-_model.eval()
 _nb_samp = _cfg["model_config"]["nb_samp"]  # 64600 (≈4.04 s @ 16 kHz)
+BACKENDS = ("torch", "onnx")
+_BACKEND = os.getenv("AASIST_BACKEND", "torch").lower()
+if _BACKEND not in BACKENDS:
+    raise ValueError(f"Unknown AASIST_BACKEND '{_BACKEND}' (expected one of {BACKENDS})")
+
+
+_model = None        # model used for inference (possibly optimised)
+_base_model = None   # fp32 torch model (torch backend only)
+_status = "not loaded"
+_load_lock = threading.RLock()
+
+
+class _Phase:
+    """Log how long a startup phase took."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            ms = (time.perf_counter() - self.start) * 1000
+            logger.info(f"Startup phase '{self.name}' took {ms:.0f} ms")
+
+
+# AASIST_RANDOM_INIT=1 skips the weights file and uses a seeded random
+# initialisation. Scores are meaningless; it exists for benchmarks and CI
+# machines that do not have AASIST.pth.
+_RANDOM_INIT = os.getenv("AASIST_RANDOM_INIT", "0") == "1"
+
+
+def _load_base_model() -> torch.nn.Module:
+    with _Phase("import model code"):
+        from models.AASIST import Model as AASISTModel  # type: ignore
+    with _Phase("build model"):
+        if _RANDOM_INIT:
+            torch.manual_seed(0)
+        model = AASISTModel(_cfg["model_config"]).to(_DEVICE)
+    if _RANDOM_INIT:
+        logger.warning("AASIST_RANDOM_INIT=1: using random weights, scores are meaningless")
+        return model.eval()
+    with _Phase("read weights"):
+        state = torch.load(_WEIGHTS_PATH, map_location=_DEVICE)
+    with _Phase("load state dict"):
+        model.load_state_dict(state)
+    return model.eval()
+
+
+def _get_base_model() -> torch.nn.Module:
+    global _base_model
+    with _load_lock:
+        if _base_model is None:
+            if _BACKEND != "torch":
+                raise RuntimeError("Inference modes need AASIST_BACKEND=torch")
+            _base_model = _load_base_model()
+        return _base_model
 
+
+class OnnxModel:
+    """ONNX Runtime session with the torch model's call contract.
+
+    Called with a (B, nb_samp) tensor it returns ``(hidden, logits)`` as
+    tensors, so the predict_* functions work unchanged on either backend.
+    """
+
+    def __init__(self, path: str | pathlib.Path = _ONNX_PATH, threads: int = 0):
+        try:
+            import onnxruntime  # noqa: F401
+        except ImportError as e:
+            raise ImportError("AASIST_BACKEND=onnx needs onnxruntime "
+                              "(pip install onnxruntime)") from e
+        if not pathlib.Path(path).exists():
+            raise FileNotFoundError(f"{path} not found; run export_onnx.py first")
+        self.path = pathlib.Path(path)
+        self.threads = threads
+        self._session = None
+        self._pid = None
+
+    @property
+    def session(self):
+        # Created lazily, once per process: ORT thread pools do not survive fork
+        if self._session is None or self._pid != os.getpid():
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = self.threads or torch.get_num_threads()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self._session = ort.InferenceSession(str(self.path), options,
+                                                 providers=["CPUExecutionProvider"])
+            self._pid = os.getpid()
+        return self._session
+
+    def __call__(self, x: torch.Tensor):
+        session = self.session
+        hidden, logits = session.run(
+            None, {session.get_inputs()[0].name:
+                   x.detach().cpu().numpy().astype(np.float32)})
+        return torch.from_numpy(hidden), torch.from_numpy(logits)
+
+    def eval(self):
+        return self
+
+
+
+# ---------------------------------------------------------------
+# Optional optimised CPU inference (AASIST_INFERENCE_MODE).
+#   fp32      eager model as trained (default)
+#   int8      dynamic int8 quantisation of the Linear layers
+#   script    TorchScript trace, cached next to the weights
+#   compile   torch.compile
+# Modes combine with "+", e.g. "int8+script".
 # ---------------------------------------------------------------
+INFERENCE_MODES = ("fp32", "int8", "script", "compile")
+
+
+def _parse_mode(mode: str) -> set[str]:
+    flags = {m.strip() for m in mode.lower().split("+") if m.strip()}
+    unknown = flags - set(INFERENCE_MODES)
+    if unknown:
+        raise ValueError(f"Unknown inference mode(s) {sorted(unknown)}; "
+                         f"expected a '+'-joined subset of {INFERENCE_MODES}")
+    if {"script", "compile"} <= flags:
+        raise ValueError("'script' and 'compile' are mutually exclusive")
+    return flags - {"fp32"}
+
+
+def _artifact_path(flags: set[str]) -> pathlib.Path:
+    """Cache file for a traced variant, tied to the weights file version."""
+    st = _WEIGHTS_PATH.stat()
+    tag = "-".join(sorted(flags))
+    return _WEIGHTS_PATH.with_name(
+        f"{_WEIGHTS_PATH.stem}.{tag}.{st.st_size}-{int(st.st_mtime)}.pt")
+
+
+def build_model(mode: str = "fp32", use_cache: bool = True) -> torch.nn.Module:
+    """Return the AASIST variant for `mode`, built from the fp32 weights.
+
+    Quantisation only applies on CPU. Traced variants are saved as a build
+    artifact and reloaded on the next start. If a variant cannot be built
+    the fp32 model is returned and a warning is logged.
+    """
+    flags = _parse_mode(mode)
+    base = _get_base_model()
+    use_cache = use_cache and not _RANDOM_INIT
+    if not flags:
+        return base
+    if _DEVICE.type != "cpu" and "int8" in flags:
+        logger.warning("int8 dynamic quantisation is CPU-only; skipping it")
+        flags.discard("int8")
+
+    if "script" in flags and use_cache:
+        artifact = _artifact_path(flags)
+        if artifact.exists():
+            logger.info(f"Loading cached TorchScript model from {artifact}")
+            return torch.jit.load(str(artifact), map_location=_DEVICE).eval()
+
+    model = base
+    try:
+        if "int8" in flags:
+            model = torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8)
+        if "script" in flags:
+            # Trace with batch size 2 so the batch dimension stays symbolic
+            example = torch.randn(2, _nb_samp, device=_DEVICE)
+            with torch.no_grad():
+                model = torch.jit.freeze(torch.jit.trace(model, example, strict=False).eval())
+            if use_cache:
+                torch.jit.save(model, str(_artifact_path(flags)))
+        if "compile" in flags:
+            model = torch.compile(model, dynamic=True)
+    except Exception as e:
+        logger.warning(f"Could not build '{mode}' model ({e}); using fp32")
+        return base
+    return model
+
+
+_INFERENCE_MODE = os.getenv("AASIST_INFERENCE_MODE", "fp32")
+
+
+def load_model():
+    """Load the configured model once (thread-safe) and return it."""
+    global _model, _status
+    if _model is not None:
+        return _model
+    with _load_lock:
+        if _model is not None:
+            return _model
+        _status = "loading"
+        start = time.perf_counter()
+        try:
+            if _BACKEND == "torch":
+                with _Phase(f"prepare '{_INFERENCE_MODE}' model"):
+                    _model = build_model(_INFERENCE_MODE)
+            else:
+                with _Phase("open ONNX model"):
+                    _model = OnnxModel()
+        except Exception:
+            _status = "error"
+            raise
+        _status = "loaded"
+        logger.info(f"AASIST ({_BACKEND}) loaded in "
+                    f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        return _model
+
+
 @torch.no_grad()
-def predict_wav(wav_path: str | pathlib.Path) -> dict:
-    """Return a dict with spoof probability & label for given WAV/FLAC."""
-    wav_path = pathlib.Path(wav_path)
-    wav, sr = torchaudio.load(str(wav_path))
-    if sr != 16000:
-        wav = torchaudio.functional.resample(wav, sr, 16000)
-    # mono
-    if wav.shape[0] > 1:
-        wav = wav.mean(0, keepdim=True)
-    # normalise length
-    if wav.shape[1] < _nb_samp:
-        pad = _nb_samp - wav.shape[1]
-        wav = torch.nn.functional.pad(wav, (0, pad))
-    wav = wav[:, :_nb_samp]
-    # z-norm
-    wav = (wav - wav.mean()) / (wav.std() + 1e-9)
-
-    logits = _model(wav.to(_DEVICE))[1]
-    prob_fake = torch.softmax(logits, dim=1)[:, 1].item()
+def warmup() -> None:
+    """Load the model and run one dummy forward pass so the first request is fast."""
+    global _status
+    model = load_model()
+    with _Phase("warm-up forward"):
+        model(torch.zeros(1, _nb_samp, device=_DEVICE))
+    _status = "ready"
+
+
+def model_status() -> str:
+    """One of "not loaded", "loading", "loaded", "ready" or "error"."""
+    return _status
+
+
+def model_identity() -> str:
+    """Backend, inference mode and weights version of the served model.
+
+    Used to namespace persisted results, so they are dropped whenever the
+    weights file, the backend or the inference mode changes.
+    """
+    if _RANDOM_INIT:
+        weights = "random"
+    else:
+        path = _ONNX_PATH if _BACKEND == "onnx" else _WEIGHTS_PATH
+        try:
+            st = path.stat()
+            weights = f"{path.name}:{st.st_size}-{st.st_mtime_ns}"
+        except OSError:
+            weights = f"{path.name}:missing"
+    mode = _INFERENCE_MODE if _BACKEND == "torch" else "-"
+    return f"{_BACKEND}:{mode}:{_nb_samp}:{weights}"
+
+
+def share_weights() -> None:
+    """Move weights to shared memory before forking worker processes.
+
+    Quantised and TorchScript modules (and ONNX Runtime sessions) keep
+    packed parameters that cannot be moved; those stay shared through
+    copy-on-write only.
+    """
+    try:
+        load_model().share_memory()
+    except (RuntimeError, AttributeError) as e:
+        logger.info(f"share_memory() not supported for this model ({e}); "
+                    "relying on copy-on-write")
+
+# ---------------------------------------------------------------
+def _result(prob_fake: float) -> dict:
     return {
         "score": float(prob_fake),
         "label": "fake" if prob_fake > 0.5 else "real"
-    } 
\ No newline at end of file
+    }
+
+
+# Bounds on source rates. The sinc kernel has one row per output phase and
+# grows with sr / gcd(sr, 16000), so a client-supplied rate like 44101
+# (gcd 1) would build a multi-GB kernel. Rates are refused when that
+# reduced ratio exceeds MAX_RATE_RATIO (44.1 kHz and 88.2 kHz give 441)
+# or when they fall outside MIN/MAX_SAMPLE_RATE.
+MIN_SAMPLE_RATE = 1000
+MAX_SAMPLE_RATE = 384000
+MAX_RATE_RATIO = 1000
+
+
+class UnsupportedSampleRate(ValueError):
+    """Audio sample rate whose resampling kernel would be too large."""
+
+
+def check_sample_rate(sr: int) -> int:
+    if not MIN_SAMPLE_RATE <= sr <= MAX_SAMPLE_RATE:
+        raise UnsupportedSampleRate(
+            f"Unsupported sample rate {sr} Hz (expected "
+            f"{MIN_SAMPLE_RATE}-{MAX_SAMPLE_RATE} Hz)")
+    if sr // math.gcd(sr, 16000) > MAX_RATE_RATIO:
+        raise UnsupportedSampleRate(
+            f"Unsupported sample rate {sr} Hz (no small ratio to 16 kHz)")
+    return sr
+
+
+@functools.lru_cache(maxsize=8)
+def _resampler(sr: int) -> torchaudio.transforms.Resample:
+    """Resample transform to 16 kHz for one source rate.
+
+    Building the sinc kernel dominates torchaudio.functional.resample for
+    short clips, so one transform per source rate is built and reused.
+    Callers go through resample_to_16k, which checks the rate first.
+    """
+    return torchaudio.transforms.Resample(sr, 16000)
+
+
+def resample_to_16k(wav: torch.Tensor, sr: int) -> torch.Tensor:
+    """Resample (..., T) audio from `sr` to 16 kHz with a cached kernel."""
+    if sr == 16000:
+        return wav
+    check_sample_rate(sr)
+    with stage_timer("resample"):
+        return _resampler(sr)(wav)
+
+
+def _source_len(sr: int) -> int:
+    """Source samples needed to produce nb_samp samples at 16 kHz.
+
+    Includes a 10 ms margin so the kept samples are not affected by the
+    resampler's edge handling at the crop point.
+    """
+    if sr == 16000:
+        return _nb_samp
+    return math.ceil(_nb_samp * sr / 16000) + sr // 100
+
+
+def _to_mono_16k(wav: torch.Tensor, sr: int, crop: bool = False) -> torch.Tensor:
+    """Mix a (C, T) tensor down to (1, T) and resample it to 16 kHz.
+
+    Mixing down first means only one channel is resampled. With `crop`,
+    only the source samples needed for one nb_samp window are resampled.
+    """
+    if crop:
+        wav = wav[:, :_source_len(sr)]
+    # mono
+    if wav.shape[0] > 1:
+        wav = wav.mean(0, keepdim=True)
+    return resample_to_16k(wav, sr)
+
+
+def _znorm(wav: torch.Tensor) -> torch.Tensor:
+    """Zero-mean, unit-variance normalisation over the last dimension."""
+    std, mean = torch.std_mean(wav, dim=-1, keepdim=True)
+    return (wav - mean) / (std + 1e-9)
+
+
+def _znorm_(wav: torch.Tensor) -> torch.Tensor:
+    """In-place `_znorm` for buffers owned by the caller."""
+    std, mean = torch.std_mean(wav, dim=-1, keepdim=True)
+    return wav.sub_(mean).div_(std.add_(1e-9))
+
+
+def preprocess(wav: torch.Tensor, sr: int) -> torch.Tensor:
+    """Resample, mix down, fix length and z-norm a (C, T) tensor to (nb_samp,)."""
+    return preprocess_batch([(wav, sr)])[0]
+
+
+def preprocess_batch(items: list[tuple[torch.Tensor, int]]) -> torch.Tensor:
+    """Preprocess many decoded (C, T) clips into one (B, nb_samp) batch.
+
+    Clips are cropped to the samples actually scored and mixed down, then
+    every clip sharing a source rate is resampled in a single call. Results
+    are zero-padded into one preallocated buffer that is z-normed in place.
+    """
+    out = torch.zeros(len(items), _nb_samp)
+    by_rate = defaultdict(list)
+    for i, (_, sr) in enumerate(items):
+        by_rate[sr].append(i)
+
+    for sr, idx in by_rate.items():
+        src_len = _source_len(sr)
+        src = torch.zeros(len(idx), src_len)
+        lengths = []
+        for row, i in enumerate(idx):
+            wav = items[i][0][:, :src_len]
+            n = wav.shape[1]
+            if wav.shape[0] > 1:
+                torch.mean(wav, 0, out=src[row, :n])
+            else:
+                src[row, :n] = wav[0]
+            lengths.append(n)
+        src = resample_to_16k(src, sr)
+        for row, i in enumerate(idx):
+            # Only copy real signal; the original pads with zeros after resampling
+            n = min(_nb_samp, math.ceil(lengths[row] * 16000 / sr))
+            out[i, :n] = src[row, :n]
+    return _znorm_(out)
+
+
+def prepare_window(wav: torch.Tensor) -> torch.Tensor:
+    """Z-norm an already 16 kHz mono window of exactly nb_samp samples."""
+    if wav.shape[-1] != _nb_samp:
+        raise ValueError(f"expected {_nb_samp} samples, got {wav.shape[-1]}")
+    return _znorm(wav.reshape(1, -1))[0]
+
+
+def _as_soundfile_source(source: AudioSource):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if isinstance(source, pathlib.Path):
+        return str(source)
+    return source
+
+
+def decode(source: AudioSource, limit: bool = False) -> tuple[torch.Tensor, int]:
+    """Decode WAV/FLAC from a path, raw bytes or a binary file-like object.
+
+    Returns a (C, T) float32 tensor and the source sample rate. Bytes and
+    buffers are decoded in memory, so uploads never touch the filesystem.
+    With `limit`, only the source frames needed for one nb_samp window at
+    16 kHz are decoded, however long the input is.
+    """
+    source = _as_soundfile_source(source)
+    with stage_timer("decode"), profiler.sample("decode"):
+        try:
+            with sf.SoundFile(source) as f:
+                # Refuse odd rates from the header, before reading samples
+                check_sample_rate(f.samplerate)
+                frames = _source_len(f.samplerate) if limit else -1
+                data = f.read(frames, dtype="float32", always_2d=True)
+                return torch.from_numpy(np.ascontiguousarray(data.T)), f.samplerate
+        except RuntimeError:
+            if not isinstance(source, str):
+                raise
+        # Paths in formats libsndfile cannot read go through torchaudio
+        sr = check_sample_rate(torchaudio.info(source).sample_rate)
+        num_frames = _source_len(sr) if limit else -1
+        return torchaudio.load(source, num_frames=num_frames)
+
+
+def load_clip(source: AudioSource) -> torch.Tensor:
+    """Decode a WAV/FLAC file or buffer into a model-ready (nb_samp,) tensor."""
+    return preprocess(*decode(source, limit=True))
+
+
+@torch.no_grad()
+def _forward(batch: torch.Tensor) -> torch.Tensor:
+    """Timed AASIST forward pass returning the logits."""
+    model = load_model()
+    with stage_timer("forward"), profiler.sample("forward"):
+        return model(batch.to(_DEVICE))[1]
+
+
+@torch.no_grad()
+def _score_batch(batch: torch.Tensor) -> list[dict]:
+    logits = _forward(batch)
+    probs = torch.softmax(logits, dim=1)[:, 1].tolist()
+    return [_result(p) for p in probs]
+
+
+def predict_batch(clips: list[torch.Tensor]) -> list[dict]:
+    """Score preprocessed clips with a single stacked AASIST forward pass."""
+    return _score_batch(torch.stack(clips))
+
+
+def _decode_or_error(source: AudioSource):
+    try:
+        return decode(source, limit=True)
+    except Exception as e:
+        return e
+
+
+def predict_many(sources: Iterable[AudioSource],
+                 batch_size: int = 16,
+                 decode_workers: int = 1) -> list[dict]:
+    """Score many inputs with parallel decoding and stacked forward passes.
+
+    Inputs are processed one batch at a time: decoded in parallel,
+    preprocessed together with preprocess_batch, then scored in one forward
+    pass, so only one batch of decoded audio is held in memory.
+
+    Returns one dict per input, in order. Inputs that fail to decode get
+    ``{"error": "..."}`` instead of a score, so one corrupt file does not
+    fail the rest.
+    """
+    sources = list(sources)
+    results: list[dict] = []
+    pool = ThreadPoolExecutor(max_workers=decode_workers) if decode_workers > 1 else None
+    try:
+        for start in range(0, len(sources), batch_size):
+            chunk = sources[start:start + batch_size]
+            decoded = list(pool.map(_decode_or_error, chunk)) if pool \
+                else [_decode_or_error(s) for s in chunk]
+            ok = [d for d in decoded if not isinstance(d, Exception)]
+            scored = iter(_score_batch(preprocess_batch(ok)) if ok else [])
+            results.extend(
+                {"error": f"{type(d).__name__}: {d}"} if isinstance(d, Exception)
+                else next(scored)
+                for d in decoded)
+    finally:
+        if pool:
+            pool.shutdown()
+    return results
+
+
+def _window_starts(n: int, hop: int) -> list[int]:
+    """Window offsets covering n samples, with the last window end-aligned."""
+    if n <= _nb_samp:
+        return [0]
+    starts = list(range(0, n - _nb_samp + 1, hop))
+    if starts[-1] + _nb_samp < n:
+        starts.append(n - _nb_samp)
+    return starts
+
+
+def _windows_in_memory(wav: torch.Tensor, hop: int, max_batch: int):
+    starts = _window_starts(wav.shape[0], hop)
+    if wav.shape[0] < _nb_samp:
+        wav = torch.nn.functional.pad(wav, (0, _nb_samp - wav.shape[0]))
+    for i in range(0, len(starts), max_batch):
+        chunk = starts[i:i + max_batch]
+        idx = torch.tensor(chunk).unsqueeze(1) + torch.arange(_nb_samp)
+        yield chunk, wav[idx]
+
+
+def _window_batches(source: AudioSource, hop: int, max_batch: int):
+    """Yield (starts, raw (B, nb_samp) windows) for a recording, block by block.
+
+    Window positions are computed from the file header, and each batch only
+    decodes and resamples the source span its windows cover (plus a small
+    margin), so memory stays bounded for hour-long inputs.
+    """
+    source = _as_soundfile_source(source)
+    try:
+        f = sf.SoundFile(source)
+    except RuntimeError:
+        if not isinstance(source, str):
+            raise
+        yield from _windows_in_memory(_to_mono_16k(*torchaudio.load(source))[0],
+                                      hop, max_batch)
+        return
+
+    with f:
+        sr = check_sample_rate(f.samplerate)
+        starts = _window_starts(math.ceil(f.frames * 16000 / sr), hop)
+        # Block starts are aligned so they land on a whole 16 kHz sample
+        align = sr // math.gcd(sr, 16000)
+        margin = 0 if sr == 16000 else sr // 100
+        for i in range(0, len(starts), max_batch):
+            chunk = starts[i:i + max_batch]
+            lo, hi = chunk[0], chunk[-1] + _nb_samp
+            s0 = max(0, (lo * sr // 16000 - margin) // align * align)
+            s1 = min(f.frames, math.ceil(hi * sr / 16000) + margin)
+            with stage_timer("decode"):
+                f.seek(s0)
+                block = f.read(s1 - s0, dtype="float32", always_2d=True)
+            seg = _to_mono_16k(torch.from_numpy(np.ascontiguousarray(block.T)), sr)[0]
+            offset = s0 * 16000 // sr
+            if seg.shape[0] < hi - offset:
+                seg = torch.nn.functional.pad(seg, (0, hi - offset - seg.shape[0]))
+            idx = torch.tensor(chunk).unsqueeze(1) - offset + torch.arange(_nb_samp)
+            yield chunk, seg[idx]
+
+
+def _aggregate(scores: torch.Tensor, method: str, top_k: int) -> float:
+    if method == "max":
+        return scores.max().item()
+    if method == "mean":
+        return scores.mean().item()
+    if method == "topk":
+        k = max(1, min(top_k, scores.numel()))
+        return scores.topk(k).values.mean().item()
+    raise ValueError(f"Unknown aggregate '{method}' (expected max, mean or topk)")
+
+
+@torch.no_grad()
+def predict_windows(source: AudioSource,
+                    hop: int | None = None,
+                    aggregate: str = "max",
+                    top_k: int = 3,
+                    max_batch: int = 32) -> dict:
+    """Score a whole recording with overlapping nb_samp-sample windows.
+
+    Windows advance by `hop` samples (default: half a window) and are scored
+    in stacked batches of up to `max_batch`; the audio is decoded one batch
+    of windows at a time. The verdict aggregates the
+    per-window fake probabilities with `aggregate` ("max", "mean" or "topk",
+    the mean of the `top_k` highest scores).
+    """
+    hop = hop or _nb_samp // 2
+    if hop <= 0:
+        raise ValueError("hop must be positive")
+
+    starts, probs = [], []
+    for chunk, windows in _window_batches(source, hop, max_batch):
+        logits = _forward(_znorm_(windows))
+        probs.append(torch.softmax(logits, dim=1)[:, 1].cpu())
+        starts.extend(chunk)
+    probs = torch.cat(probs)
+
+    result = _result(_aggregate(probs, aggregate, top_k))
+    result.update({
+        "aggregate": aggregate,
+        "hop": hop,
+        "segments": [
+            {
+                "start_s": round(st / 16000, 3),
+                "end_s": round((st + _nb_samp) / 16000, 3),
+                "score": float(p),
+            }
+            for st, p in zip(starts, probs.tolist())
+        ],
+    })
+    return result
+
+
+def predict_wav(source: AudioSource) -> dict:
+    """Return a dict with spoof probability & label for given WAV/FLAC.
+
+    `source` may be a file path, the raw file bytes or a binary buffer.
+    """
+    with profiler.sample("predict_wav"):
+        return predict_batch([load_clip(source)])[0]
@@ -1,12 +1,31 @@
+import io
 import os
-import tempfile
+import secrets
+import tarfile
+import threading
+import zipfile
+import torch
 import uvicorn
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import (Depends, FastAPI, File, Header, UploadFile, HTTPException,
+                     Query, WebSocket, WebSocketDisconnect)
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel
 import logging
 # Use the thin wrapper around the official AASIST implementation
-from aasist_predictor import predict_wav
+from aasist_predictor import (load_clip, model_status, predict_batch,
+                              predict_many, predict_windows, prepare_window,
+                              model_identity, warmup, UnsupportedSampleRate,
+                              _nb_samp)
+from batching import MicroBatcher, Overloaded, WorkerPool
+# aasist/evaluation.py (importable once aasist_predictor has set the path)
+from evaluation import ScoreAccumulator
+from cache import ResultCache, digest
+from jobs import JobStore
+import metrics
+from metrics import Counter, Gauge, stage_timer
+from profiling import profiler
+from streaming import StreamSession
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -28,79 +47,550 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# No explicit startup needed; model is loaded lazily inside `aasist_predictor`.
+RETRY_AFTER = int(os.getenv("AASIST_RETRY_AFTER", "1"))
+
+# Decoding runs on a bounded thread pool so the event loop stays free for
+# /health and new uploads; requests beyond its backlog get a fast 503.
+decode_pool = WorkerPool(
+    max_workers=int(os.getenv("AASIST_INFERENCE_WORKERS", "2")),
+    max_queue=int(os.getenv("AASIST_MAX_QUEUE", "32")),
+    retry_after=RETRY_AFTER,
+    name="aasist-decode",
+)
+
+# Concurrent /predict/ calls are grouped into one AASIST forward pass.
+# Tune the window with AASIST_MAX_BATCH_SIZE / AASIST_MAX_WAIT_MS.
+batcher = MicroBatcher(
+    predict_batch,
+    max_batch_size=int(os.getenv("AASIST_MAX_BATCH_SIZE", "16")),
+    max_wait_ms=float(os.getenv("AASIST_MAX_WAIT_MS", "5")),
+    max_queue=int(os.getenv("AASIST_MAX_QUEUE", "32")),
+    retry_after=RETRY_AFTER,
+)
+
+# Repeat submissions are answered from a cache keyed by content hash.
+# AASIST_CACHE_DIR enables a SQLite tier that survives restarts; keys are
+# namespaced by the model identity so a new model never sees old results.
+_cache_dir = os.getenv("AASIST_CACHE_DIR")
+cache = ResultCache(
+    max_entries=int(os.getenv("AASIST_CACHE_SIZE", "4096")),
+    ttl_s=float(os.getenv("AASIST_CACHE_TTL", "86400")),
+    disk_path=os.path.join(_cache_dir, "results.sqlite") if _cache_dir else None,
+    disk_max_entries=int(os.getenv("AASIST_CACHE_DISK_SIZE", "100000")),
+    namespace=digest(model_identity().encode())[:16] + ":",
+)
+
+# Upper bound on files (including archive members) per /predict/batch call,
+# and on the total uncompressed size of archive members
+BATCH_MAX_FILES = int(os.getenv("AASIST_BATCH_MAX_FILES", "1000"))
+BATCH_MAX_BYTES = int(os.getenv("AASIST_BATCH_MAX_BYTES", str(512 * 1024 * 1024)))
+AUDIO_EXTENSIONS = (".wav", ".flac")
+
+# Offline jobs are queued here and scored by `python jobs.py worker`.
+# POST /jobs is refused unless AASIST_JOBS_ROOT is set, and every submitted
+# path must live under it.
+JOBS_ROOT = os.getenv("AASIST_JOBS_ROOT")
+job_store = JobStore()
+
+class JobRequest(BaseModel):
+    path: str  # directory to scan, or manifest file with one path per line
+
+# /admin/* routes are only registered when AASIST_ADMIN_TOKEN is set, and
+# then require it in the X-Admin-Token header.
+ADMIN_TOKEN = os.getenv("AASIST_ADMIN_TOKEN")
+
+class ProfileSettings(BaseModel):
+    rate: float | None = None  # fraction of calls to profile, 0 switches off
+    mode: str | None = None    # "torch" (Chrome trace) or "cprofile" (pstats)
+    reset: bool = False        # clear the aggregated operator table
+
+# Live streams share the batcher with uploads; each holds one window of audio.
+MAX_STREAMS = int(os.getenv("AASIST_MAX_STREAMS", "64"))
+active_streams = 0
+
+# Rolling window of served scores for the /calibration view
+calibration = ScoreAccumulator(
+    window=int(os.getenv("AASIST_CALIBRATION_WINDOW", "10000")))
+
+# Prometheus metrics served on /metrics (per worker process). Stage timings
+# (upload_read, decode, resample, forward, serialize) share one histogram.
+REQUESTS = Counter("aasist_requests_total", "Requests received", ("endpoint",))
+ERRORS = Counter("aasist_errors_total", "Requests that failed or were shed",
+                 ("endpoint",))
+PREDICTIONS = Counter("aasist_predictions_total", "Predictions returned", ("label",))
+Counter("aasist_cache_hits_total", "Result cache hits", fn=lambda: cache.hits)
+Counter("aasist_cache_misses_total", "Result cache misses", fn=lambda: cache.misses)
+Gauge("aasist_batch_queue_depth", "Clips waiting for the batcher",
+      fn=lambda: batcher.stats()["queue_depth"])
+Gauge("aasist_inflight_inferences", "Decode jobs and clips being scored",
+      fn=lambda: decode_pool.stats()["in_flight"] + batcher.in_flight)
+Gauge("aasist_active_streams", "Open /ws/stream sessions",
+      fn=lambda: active_streams)
+
+def _warm_up():
+    try:
+        warmup()
+        logger.info("✅ AASIST model warmed up; ready for traffic")
+    except Exception:
+        logger.exception("Model warm-up failed")
+
+@app.on_event("startup")
+async def start_batcher():
+    await batcher.start()
+    # Load weights and run a dummy forward in the background so the server
+    # answers liveness probes immediately and the first request isn't slow
+    threading.Thread(target=_warm_up, name="aasist-warmup", daemon=True).start()
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    await batcher.stop()
+    decode_pool.shutdown()
+
+def _overloaded(e: Overloaded) -> HTTPException:
+    logger.warning(f"Shedding request: {e}")
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy, please retry shortly",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+def _decode_with_key(data: bytes):
+    """Decode an upload, hash its model-ready waveform and look the hash up
+    in the cache (runs in the pool)."""
+    clip = load_clip(data)
+    wav_key = digest(clip.numpy(), "wav:")
+    return clip, wav_key, cache.get(wav_key)
+
+class ArchiveTooLarge(ValueError):
+    """An archive has more members or uncompressed bytes than allowed."""
+
+def _expand_upload(filename: str, data: bytes, max_files: int,
+                   max_bytes: int) -> list[tuple[str, bytes | None]]:
+    """Return (name, bytes) audio items for an upload, unpacking zip/tar archives.
+
+    Member counts and declared sizes are checked against ``max_files`` /
+    ``max_bytes`` before anything is decompressed, so a zip bomb is
+    refused up front. Unsupported files come back with ``None`` bytes so
+    they can be reported per item.
+    """
+    name = filename.lower()
+    if name.endswith(AUDIO_EXTENSIONS):
+        return [(filename, data)]
+    if name.endswith(".zip"):
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            infos = zf.infolist()
+            if len(infos) > max_files:
+                raise ArchiveTooLarge(f"{filename} has {len(infos)} entries")
+            members = [info for info in infos if not info.is_dir()
+                       and info.filename.lower().endswith(AUDIO_EXTENSIONS)]
+            if sum(info.file_size for info in members) > max_bytes:
+                raise ArchiveTooLarge(f"{filename} expands beyond {max_bytes} bytes")
+            # ZipExtFile stops at the declared file_size, so the check holds
+            return [(info.filename, zf.read(info)) for info in members]
+    if name.endswith((".tar", ".tar.gz", ".tgz")):
+        with tarfile.open(fileobj=io.BytesIO(data)) as tf:
+            members, total = [], 0
+            for count, m in enumerate(tf, 1):
+                if count > max_files:
+                    raise ArchiveTooLarge(f"{filename} has more than {max_files} entries")
+                # Every member counts: skipping one still decompresses it
+                # (.tar.gz), so the check runs before iteration moves past it
+                total += m.size
+                if total > max_bytes:
+                    raise ArchiveTooLarge(f"{filename} expands beyond {max_bytes} bytes")
+                if m.isfile() and m.name.lower().endswith(AUDIO_EXTENSIONS):
+                    members.append(m)
+            return [(m.name, tf.extractfile(m).read()) for m in members]
+    return [(filename, None)]
+
+def _stream_clip(session: StreamSession, window):
+    """Model-ready clip for a released stream window (runs in the pool)."""
+    return prepare_window(torch.from_numpy(session.to_16k(window)))
+
+def _lookup(data: bytes, prefix: str):
+    """Hash an upload and look it up in the cache (runs in the pool)."""
+    key = digest(data, prefix)
+    return key, cache.get(key)
+
+async def _cache_put(*items: tuple[str, dict]) -> None:
+    """Store results, doing SQLite writes in the pool when a disk tier is set."""
+    if not cache.persistent:
+        cache.put_many(list(items))
+        return
+    try:
+        await decode_pool.run(cache.put_many, list(items))
+    except Overloaded:
+        logger.warning("Decode pool busy; result not cached")
+
+def _lookup_items(items: list[tuple[str, bytes | None]]) -> list:
+    """Hash each item and look it up in the cache (runs in the pool)."""
+    lookups = []
+    for _, data in items:
+        key = digest(data, "raw:") if data is not None else None
+        lookups.append((key, cache.get(key) if key is not None else None))
+    return lookups
+
+def _to_response(result: dict) -> dict:
+    """Transform a predictor result to the format the frontend expects."""
+    score = result["score"]  # Raw probability of fake (0-1)
+    label = result["label"]  # "real" or "fake"
+    threshold = 0.5         # Fixed threshold used by AASIST
+    
+    # Calculate confidence based on how far the score is from the threshold
+    confidence = abs(score - threshold) * 2  # Scale to 0-1 range
+    confidence = min(confidence, 1.0)        # Cap at 1.0
+    PREDICTIONS.inc(label=label)
+    calibration.add([score])
+    
+    return {
+        "result": label,
+        "score": score,
+        "confidence": confidence,
+        "threshold": threshold,
+        "model_type": "AASIST"
+    }
 
 @app.get("/")
 async def root():
     """Health check endpoint"""
     return {"message": "Deepfake Audio Detection API is running"}
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and the event loop is responsive."""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness probe: 200 once the model is loaded and warmed up, else 503."""
+    status = model_status()
+    ready = status == "ready"
+    return JSONResponse(status_code=200 if ready else 503,
+                        content={"status": "ready" if ready else "not ready",
+                                 "model_status": status})
+
 @app.get("/health")
 async def health_check():
     """Return basic service & model availability information."""
-    try:
-        # Attempt a trivial model attribute access to ensure import succeeded
-        from aasist_predictor import _model  # type: ignore
-        model_status = "loaded" if _model is not None else "not loaded"
-    except Exception:
-        model_status = "error"
     return {
         "status": "healthy",
-        "model_status": model_status,
-        "version": "1.0.0"
+        "model_status": model_status(),
+        "version": "1.0.0",
+        "worker_pid": os.getpid(),
+        "batching": batcher.stats(),
+        "decode_pool": decode_pool.stats(),
+        "active_streams": active_streams,
+        "cache": cache.stats()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus scrape endpoint (text exposition format 0.0.4)."""
+    return PlainTextResponse(metrics.render(),
+                             media_type="text/plain; version=0.0.4")
+
+@app.get("/calibration")
+async def calibration_view():
+    """Distribution of recently served scores (flag rate, quantiles, histogram)."""
+    return calibration.calibration(threshold=0.5)
+
+def _require_admin(x_admin_token: str | None = Header(None)) -> None:
+    if x_admin_token is None or not secrets.compare_digest(
+            x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid admin token")
+
+if ADMIN_TOKEN:
+    @app.get("/admin/profile", dependencies=[Depends(_require_admin)])
+    async def profile_report(top: int = Query(20, ge=1, le=500)):
+        """Profiler settings and the top-N operators aggregated over all samples."""
+        return {**profiler.stats(), "top": profiler.top(top)}
+
+    @app.post("/admin/profile", dependencies=[Depends(_require_admin)])
+    async def profile_configure(settings: ProfileSettings):
+        """Switch sampled profiling on/off or change its rate/mode at runtime."""
+        try:
+            profiler.configure(settings.rate, settings.mode)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if settings.reset:
+            profiler.reset()
+        logger.info(f"Profiling set to {profiler.stats()}")
+        return profiler.stats()
+
 @app.post("/predict/")
-async def predict_audio(file: UploadFile = File(...)):
+async def predict_audio(
+    file: UploadFile = File(...),
+    windowed: bool = Query(False, description="Score the whole recording in overlapping windows"),
+    aggregate: str = Query("max", pattern="^(max|mean|topk)$"),
+    top_k: int = Query(3, ge=1),
+    hop: int | None = Query(None, ge=1600, description="Window hop in samples @ 16 kHz"),
+):
     """
     Predict if the uploaded audio is real or fake using AASIST model
     
     Args:
         file: WAV audio file
+        windowed: if true, score every ~4 s window instead of only the first
+        aggregate: how window scores are combined (max, mean or topk)
+        top_k: number of windows averaged when aggregate is "topk"
+        hop: window hop in samples (default: half a window)
         
     Returns:
         JSON with prediction result and confidence score
+        (plus per-window "segments" in windowed mode)
     """
+    REQUESTS.inc(endpoint="predict")
     # Validate file type
     if not file.filename.lower().endswith((".wav", ".flac")):
+        ERRORS.inc(endpoint="predict")
         raise HTTPException(status_code=400, detail="Only WAV/FLAC files supported")
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
+    with stage_timer("upload_read"):
         data = await file.read()
-        tmp.write(data)
-        temp_path = tmp.name
 
     try:
         logger.info(f"Processing audio file: {file.filename}")
-        result = predict_wav(temp_path)
-        
-        # Transform to match frontend expected format
-        score = result["score"]  # Raw probability of fake (0-1)
-        label = result["label"]  # "real" or "fake"
-        threshold = 0.5         # Fixed threshold used by AASIST
-        
-        # Calculate confidence based on how far the score is from the threshold
-        confidence = abs(score - threshold) * 2  # Scale to 0-1 range
-        confidence = min(confidence, 1.0)        # Cap at 1.0
+        # Fast first check on the raw bytes, before any decoding
+        prefix = f"win:{hop}:{aggregate}:{top_k}:" if windowed else "raw:"
+        raw_key, result = await decode_pool.run(_lookup, data, prefix)
+        if result is None and windowed:
+            # The windows of one recording already form their own batch
+            result = await decode_pool.run(
+                lambda: predict_windows(data, hop=hop, aggregate=aggregate, top_k=top_k))
+            cache.record_miss()
+            await _cache_put((raw_key, result))
+        elif result is None:
+            # Decoded straight from memory; no temp file is written.
+            # Re-encoded copies of a clip still hit on the waveform hash.
+            clip, wav_key, result = await decode_pool.run(_decode_with_key, data)
+            if result is None:
+                result = await batcher.submit(clip)
+                cache.record_miss()
+                await _cache_put((wav_key, result), (raw_key, result))
+            else:
+                await _cache_put((raw_key, result))
         
-        response = {
-            "result": label,
-            "score": score,
-            "confidence": confidence,
-            "threshold": threshold,
-            "model_type": "AASIST"
-        }
+        with stage_timer("serialize"):
+            response = _to_response(result)
+            if windowed:
+                response["aggregate"] = result["aggregate"]
+                response["segments"] = result["segments"]
+            json_response = JSONResponse(content=response)
         
-        logger.info(f"Prediction result: {response}")
-        return JSONResponse(content=response)
+        logger.info(f"Prediction result: { {k: v for k, v in response.items() if k != 'segments'} }")
+        return json_response
+    except Overloaded as e:
+        ERRORS.inc(endpoint="predict")
+        raise _overloaded(e)
+    except UnsupportedSampleRate as e:
+        ERRORS.inc(endpoint="predict")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        ERRORS.inc(endpoint="predict")
         logger.exception("Prediction failed")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
+
+@app.post("/predict/batch")
+async def predict_batch_files(files: list[UploadFile] = File(...)):
+    """
+    Predict many files in one request.
+    
+    Accepts several WAV/FLAC files and/or zip/tar archives of them. Files are
+    decoded in parallel and scored in stacked AASIST batches.
+    
+    Returns:
+        JSON with one entry per audio item, in upload order. Items that could
+        not be decoded carry an "error" field instead of a prediction.
+    """
+    REQUESTS.inc(endpoint="predict_batch")
+    items = []
+    bytes_left = BATCH_MAX_BYTES
+    try:
+        for upload in files:
+            with stage_timer("upload_read"):
+                data = await upload.read()
+            try:
+                # Decompression runs in the pool, never on the event loop
+                expanded = await decode_pool.run(
+                    _expand_upload, upload.filename, data,
+                    BATCH_MAX_FILES - len(items), bytes_left)
+            except (zipfile.BadZipFile, tarfile.TarError) as e:
+                expanded = [(upload.filename, None)]
+                logger.warning(f"Could not unpack {upload.filename}: {e}")
+            except ArchiveTooLarge as e:
+                ERRORS.inc(endpoint="predict_batch")
+                raise HTTPException(status_code=413, detail=str(e))
+            items.extend(expanded)
+            bytes_left -= sum(len(d) for _, d in expanded if d is not None)
+            if len(items) > BATCH_MAX_FILES:
+                ERRORS.inc(endpoint="predict_batch")
+                raise HTTPException(status_code=413,
+                                    detail=f"At most {BATCH_MAX_FILES} files per batch")
+
+        logger.info(f"Processing batch of {len(items)} audio items")
+        lookups = await decode_pool.run(_lookup_items, items)
+    except Overloaded as e:
+        ERRORS.inc(endpoint="predict_batch")
+        raise _overloaded(e)
+
+    results: list[dict | None] = [None] * len(items)
+    todo = []
+    for i, ((name, data), (key, cached)) in enumerate(zip(items, lookups)):
+        if data is None:
+            results[i] = {"error": "Only WAV/FLAC files (or zip/tar archives) supported"}
+        elif cached is not None:
+            results[i] = cached
+        else:
+            todo.append((i, key, data))
+
+    if todo:
         try:
-            os.unlink(temp_path)
-        except OSError:
-            pass
+            scored = await decode_pool.run(
+                predict_many, [data for _, _, data in todo],
+                batcher.max_batch_size, decode_pool.max_workers)
+        except Overloaded as e:
+            ERRORS.inc(endpoint="predict_batch")
+            raise _overloaded(e)
+        except Exception as e:
+            ERRORS.inc(endpoint="predict_batch")
+            logger.exception("Batch prediction failed")
+            raise HTTPException(status_code=500, detail=str(e))
+        fresh = []
+        for (i, key, _), result in zip(todo, scored):
+            results[i] = result
+            if "error" not in result:
+                cache.record_miss()
+                fresh.append((key, result))
+        await _cache_put(*fresh)
+
+    with stage_timer("serialize"):
+        response = []
+        for (name, _), result in zip(items, results):
+            if "error" in result:
+                response.append({"filename": name, "error": result["error"]})
+            else:
+                response.append({"filename": name, **_to_response(result)})
+        failed = sum(1 for r in response if "error" in r)
+        return JSONResponse(content={
+            "count": len(response),
+            "succeeded": len(response) - failed,
+            "failed": failed,
+            "results": response,
+        })
+
+@app.post("/jobs")
+async def submit_job(request: JobRequest):
+    """Queue a directory or manifest for offline scoring and return its id."""
+    if not JOBS_ROOT:
+        raise HTTPException(status_code=403,
+                            detail="Job submission is disabled (AASIST_JOBS_ROOT is not set)")
+    path = os.path.realpath(request.path)
+    try:
+        # Scanning the tree and inserting the items runs in the pool
+        job_id = await decode_pool.run(job_store.submit, path, JOBS_ROOT)
+        status = await decode_pool.run(job_store.status, job_id)
+    except PermissionError:
+        raise HTTPException(status_code=403, detail="Path outside AASIST_JOBS_ROOT")
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Overloaded as e:
+        raise _overloaded(e)
+    logger.info(f"Queued job {job_id} for {path}")
+    return status
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Progress counters for a job."""
+    try:
+        status = await decode_pool.run(job_store.status, job_id)
+    except Overloaded as e:
+        raise _overloaded(e)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return status
+
+@app.get("/jobs/{job_id}/results")
+async def job_results(job_id: str, after: int = 0, limit: int = Query(1000, le=10000)):
+    """
+    Results that finished after cursor `after`, in completion order.
+    
+    Poll with the last entry's `seq` to receive results as they stream in.
+    """
+    try:
+        status = await decode_pool.run(job_store.status, job_id)
+        if status is None:
+            raise HTTPException(status_code=404, detail="Unknown job")
+        results = await decode_pool.run(job_store.results, job_id, after, limit)
+    except Overloaded as e:
+        raise _overloaded(e)
+    return {
+        "job_id": job_id,
+        "next_after": results[-1]["seq"] if results else after,
+        "results": results,
+    }
+
+@app.websocket("/ws/stream")
+async def stream_audio(
+    websocket: WebSocket,
+    sample_rate: int = 16000,
+    format: str = "int16",
+    hop: int = 16000,
+):
+    """
+    Score live audio as it arrives.
+    
+    The client sends binary frames of mono little-endian PCM (`format` is
+    int16 or float32, at `sample_rate`). Once a full ~4 s window has been
+    received, and then after every further `hop` samples (@ 16 kHz), the
+    server replies with the usual prediction JSON plus `type: "score"` and
+    `audio_end_s`. Sending the text message "end" closes the session.
+    """
+    global active_streams
+    REQUESTS.inc(endpoint="stream")
+    await websocket.accept()
+    if active_streams >= MAX_STREAMS:
+        await websocket.close(code=1013, reason="Too many live streams")
+        return
+    try:
+        session = StreamSession(_nb_samp, hop, sample_rate, format)
+    except ValueError as e:
+        await websocket.close(code=1003, reason=str(e))
+        return
+
+    active_streams += 1
+    logger.info(f"Live stream opened ({active_streams} active)")
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text") == "end":
+                await websocket.close()
+                break
+            frame = message.get("bytes")
+            if not frame:
+                continue
+            # Buffering stays on the loop so no frame is ever dropped; the
+            # resample + z-norm of a released window runs in the pool, and
+            # is awaited before the next frame is read to keep order
+            window = session.feed(frame)
+            if window is None:
+                continue
+            try:
+                clip = await decode_pool.run(_stream_clip, session, window)
+                result = await batcher.submit(clip)
+            except Overloaded as e:
+                ERRORS.inc(endpoint="stream")
+                await websocket.send_json({"type": "busy", "retry_after": e.retry_after})
+                continue
+            response = _to_response(result)
+            response.update({"type": "score", "audio_end_s": round(session.seconds, 3)})
+            await websocket.send_json(response)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        active_streams -= 1
+        logger.info(f"Live stream closed ({active_streams} active)")
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,214 @@
+"""
+In-process micro-batching scheduler for AASIST inference.
+
+Concurrent requests are collected for up to ``max_wait_ms`` (or until
+``max_batch_size`` clips are waiting) and scored with one forward pass.
+Blocking work (decode, forward) never runs on the event loop, and both
+stages are bounded so overload is shed with ``Overloaded`` instead of
+queueing without limit.
+"""
+
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Sequence
+
+
+class Overloaded(Exception):
+    """Raised when a bounded stage is full and the request should be shed."""
+
+    def __init__(self, stage: str, retry_after: int = 1):
+        super().__init__(f"{stage} is at capacity")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class LatencyStats:
+    """Rolling window of latency samples with percentile summaries."""
+
+    def __init__(self, history: int = 1024):
+        self._samples: deque[float] = deque(maxlen=history)
+        self.count = 0
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, q: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+        }
+
+
+class WorkerPool:
+    """Run blocking callables on a fixed thread pool with a bounded backlog.
+
+    At most ``max_workers`` calls execute at once and at most ``max_queue``
+    more may wait; anything beyond that is rejected immediately.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 32,
+                 retry_after: int = 1, name: str = "aasist-worker"):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self._name = name
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix=name)
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    async def run(self, fn: Callable, *args) -> Any:
+        if self._pending >= self.capacity:
+            raise Overloaded(self._name, self.retry_after)
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": min(self._pending, self.max_workers),
+            "queued": max(0, self._pending - self.max_workers),
+        }
+
+
+class MicroBatcher:
+    """Group concurrent ``submit`` calls into batches for ``predict_fn``.
+
+    ``predict_fn`` receives a list of items and must return one result per
+    item, in order. It runs on a dedicated worker thread so the event loop
+    keeps collecting the next batch while the current one is scored.
+    """
+
+    def __init__(self,
+                 predict_fn: Callable[[list], Sequence[Any]],
+                 max_batch_size: int = 16,
+                 max_wait_ms: float = 5.0,
+                 max_queue: int = 0,
+                 retry_after: int = 1,
+                 history: int = 1024):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_queue = max(0, max_queue)  # 0 = unbounded
+        self.retry_after = retry_after
+        self.latency = LatencyStats(history)
+        self.forward = LatencyStats(history)
+        self._batch_sizes: deque[int] = deque(maxlen=history)
+        self.in_flight = 0  # items in the forward pass right now
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._executor: ThreadPoolExecutor | None = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="aasist-batch")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result.
+
+        Raises ``Overloaded`` straight away if the queue is full.
+        """
+        if self._queue is None:
+            raise RuntimeError("MicroBatcher has not been started")
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((item, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            raise Overloaded("batch queue", self.retry_after) from None
+        return await future
+
+    def stats(self) -> dict:
+        sizes = self._batch_sizes
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "in_flight": self.in_flight,
+            "mean_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+            "latency": self.latency.snapshot(),
+            "forward": self.forward.snapshot(),
+        }
+
+    async def _collect(self) -> list:
+        pending = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(pending) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return pending
+
+    def _timed_predict(self, items: list) -> tuple[Sequence[Any], float]:
+        start = time.perf_counter()
+        results = self.predict_fn(items)
+        return results, time.perf_counter() - start
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = await self._collect()
+            # Requests whose caller already went away are not worth scoring
+            pending = [p for p in pending if not p[1].done()]
+            if not pending:
+                continue
+            items = [p[0] for p in pending]
+            self.in_flight = len(items)
+            try:
+                results, elapsed = await loop.run_in_executor(
+                    self._executor, self._timed_predict, items)
+            except Exception as e:
+                for _, future, _ in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.in_flight = 0
+            self.forward.add(elapsed)
+            self._batch_sizes.append(len(items))
+            done = time.perf_counter()
+            for (_, future, queued), result in zip(pending, results):
+                self.latency.add(done - queued)
+                if not future.done():
+                    future.set_result(result)
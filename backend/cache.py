@@ -0,0 +1,177 @@
+"""
+Content-addressed cache for prediction results.
+
+Entries are keyed by a SHA-256 digest (of the raw upload bytes, or of the
+decoded model-ready waveform) and evicted LRU once ``max_entries`` is
+reached or when older than ``ttl_s``. An optional SQLite file keeps results
+across restarts; it is trimmed to ``disk_max_entries`` rows (oldest first)
+and purged of expired rows at most every ``purge_interval_s`` seconds.
+
+Keys are stored under ``namespace`` (e.g. a hash of the model identity), so
+persisted results of a different model or inference mode are never served.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+def digest(data, prefix: str = "") -> str:
+    """Hex SHA-256 of a bytes-like object, namespaced by ``prefix``."""
+    return prefix + hashlib.sha256(memoryview(data).cast("B")).hexdigest()
+
+
+class ResultCache:
+    """Thread-safe in-memory LRU/TTL cache with an optional on-disk tier."""
+
+    def __init__(self, max_entries: int = 4096, ttl_s: float = 86400,
+                 disk_path: str | Path | None = None,
+                 disk_max_entries: int = 100_000, namespace: str = "",
+                 purge_interval_s: float = 300):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.disk_max_entries = disk_max_entries
+        self.namespace = namespace
+        self.purge_interval_s = purge_interval_s
+        self._next_purge = 0.0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk_path = Path(disk_path) if disk_path is not None and self.enabled else None
+        self._conn = None
+        self._pid = None
+
+    @property
+    def _db(self) -> sqlite3.Connection | None:
+        """The SQLite tier, opened lazily once per process (call under the lock).
+
+        A connection must not cross a fork, so a cache built at import time
+        in a pre-fork parent opens its own connection in each worker.
+        """
+        if self.disk_path is None:
+            return None
+        if self._conn is None or self._pid != os.getpid():
+            self.disk_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.disk_path), check_same_thread=False)
+            self._pid = os.getpid()
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, value TEXT, created REAL)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+            self._purge_disk(time.time())
+            self._conn.commit()
+        return self._conn
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def persistent(self) -> bool:
+        """True when lookups and writes may touch the SQLite tier."""
+        return self.disk_path is not None
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_s > 0 and time.time() - created > self.ttl_s
+
+    def _remember(self, key: str, created: float, value: dict) -> None:
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_get(self, key: str):
+        row = self._db.execute(
+            "SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, created = json.loads(row[0]), row[1]
+        if self._expired(created):
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        self._remember(key, created, value)
+        return value
+
+    def _purge_disk(self, now: float) -> None:
+        """Drop expired rows, then the oldest rows beyond disk_max_entries."""
+        if self.ttl_s > 0:
+            self._db.execute("DELETE FROM results WHERE created < ?",
+                             (now - self.ttl_s,))
+        if self.disk_max_entries > 0:
+            self._db.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results "
+                "ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.disk_max_entries,))
+        self._next_purge = now + self.purge_interval_s
+
+    def get(self, key: str) -> dict | None:
+        """Return a copy of the cached result, or None.
+
+        Hits are counted here; callers that try several keys for one request
+        report the overall miss with ``record_miss``.
+        """
+        if not self.enabled:
+            return None
+        key = self.namespace + key
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1])
+            if self._db is not None:
+                value = self._disk_get(key)
+                if value is not None:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return dict(value)
+            return None
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def put(self, key: str, value: dict) -> None:
+        self.put_many([(key, value)])
+
+    def put_many(self, items: list[tuple[str, dict]]) -> None:
+        """Store several results with a single SQLite commit."""
+        if not self.enabled or not items:
+            return
+        created = time.time()
+        rows = [(self.namespace + key, value) for key, value in items]
+        with self._lock:
+            for key, value in rows:
+                self._remember(key, created, dict(value))
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                    [(key, json.dumps(value), created) for key, value in rows])
+                if created >= self._next_purge:
+                    self._purge_disk(created)
+                self._db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "persistent": self.persistent,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
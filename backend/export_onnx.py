@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Export the AASIST model (AASIST.conf + AASIST.pth) to ONNX.
+
+The exported graph has a dynamic batch dimension and is served by
+AASIST_BACKEND=onnx in aasist_predictor.
+
+Usage:
+    python export_onnx.py [--output aasist/models/weights/AASIST.onnx] [--opset 17]
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# The exporter always needs the torch model, whatever the serving backend is
+os.environ["AASIST_BACKEND"] = "torch"
+os.environ["AASIST_INFERENCE_MODE"] = "fp32"
+
+
+def export(output: Path, opset: int = 17) -> Path:
+    import torch
+    import aasist_predictor as ap
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    example = torch.randn(2, ap._nb_samp)
+    with torch.no_grad():
+        torch.onnx.export(
+            ap.build_model("fp32"),
+            (example,),
+            str(output),
+            input_names=["waveform"],
+            output_names=["hidden", "logits"],
+            dynamic_axes={
+                "waveform": {0: "batch"},
+                "hidden": {0: "batch"},
+                "logits": {0: "batch"},
+            },
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export AASIST to ONNX")
+    parser.add_argument("--output", default=os.getenv(
+        "AASIST_ONNX_PATH", "aasist/models/weights/AASIST.onnx"))
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    print("📦 Exporting AASIST to ONNX...")
+    try:
+        path = export(Path(args.output), args.opset)
+    except Exception as e:
+        print(f"❌ Export failed: {e}")
+        return 1
+    print(f"✅ Saved {path} ({path.stat().st_size / 1e6:.1f} MB)")
+    print("Check it with: python tests/check_onnx_parity.py")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Persistent job queue for large offline scoring runs.
+
+A job is a directory (scanned recursively for WAV/FLAC) or a manifest file
+(one audio path per line). Its items are stored in SQLite; worker
+processes claim pending items in chunks, score them through the batched
+AASIST path and write each result as soon as its chunk finishes. Items
+left "running" by a dead worker process are put back to "pending" (when
+workers start, and by the parent whenever it replaces a dead worker), and
+finished items are never scored again.
+
+Usage:
+    python jobs.py submit /data/archive          # or a manifest .txt file
+    python jobs.py worker --workers 4
+    python jobs.py status <job_id>
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = (".wav", ".flac")
+DEFAULT_DB = os.getenv("AASIST_JOBS_DB", "jobs/jobs.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    created REAL NOT NULL,
+    total INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker INTEGER,
+    score REAL,
+    label TEXT,
+    error TEXT,
+    finished REAL,
+    seq INTEGER,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS items_status ON items (status);
+CREATE INDEX IF NOT EXISTS items_seq ON items (job_id, seq);
+CREATE INDEX IF NOT EXISTS items_last_seq ON items (seq);
+"""
+
+
+class JobStore:
+    """SQLite-backed storage for jobs and their per-file items.
+
+    Connections are opened lazily, one per process and thread, so a store
+    created before a fork (e.g. at app import under pre-forked workers) is
+    never shared with the children.
+    """
+
+    def __init__(self, db_path: str | Path = DEFAULT_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            # Autocommit mode; multi-statement updates use explicit transactions
+            local.conn = sqlite3.connect(str(self.db_path), isolation_level=None,
+                                         timeout=30)
+            local.conn.execute("PRAGMA journal_mode=WAL")
+            local.conn.executescript(_SCHEMA)
+            local.pid = os.getpid()
+        return local.conn
+
+    def close(self) -> None:
+        """Close this thread's connection; the next call reopens it."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+    @staticmethod
+    def collect(source: str | Path) -> list[str]:
+        """Audio paths for a directory (recursive) or a manifest file."""
+        source = Path(source)
+        if source.is_dir():
+            return sorted(str(p) for p in source.rglob("*")
+                          if p.is_file() and p.suffix.lower() in AUDIO_EXTENSIONS)
+        if source.is_file():
+            base = source.parent
+            paths = []
+            for line in source.read_text().splitlines():
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    path = Path(line)
+                    paths.append(str(path if path.is_absolute() else base / path))
+            return paths
+        raise FileNotFoundError(f"No such directory or manifest: {source}")
+
+    def submit(self, source: str | Path, root: str | Path | None = None) -> str:
+        """Queue every audio file of ``source``; return the new job id.
+
+        With ``root``, the source and every collected path (manifests may
+        list absolute paths) must resolve inside it, else PermissionError.
+        """
+        paths = self.collect(source)
+        if root is not None:
+            root = os.path.realpath(root)
+            for path in [str(source), *paths]:
+                if os.path.commonpath([os.path.realpath(path), root]) != root:
+                    raise PermissionError(f"{path} is outside {root}")
+        job_id = uuid.uuid4().hex
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute("INSERT INTO jobs VALUES (?, ?, ?, ?)",
+                               (job_id, str(source), time.time(), len(paths)))
+            self._conn.executemany(
+                "INSERT INTO items (job_id, idx, path) VALUES (?, ?, ?)",
+                [(job_id, i, p) for i, p in enumerate(paths)])
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def status(self, job_id: str) -> dict | None:
+        job = self._conn.execute(
+            "SELECT source, created, total FROM jobs WHERE id = ?",
+            (job_id,)).fetchone()
+        if job is None:
+            return None
+        counts = dict(self._conn.execute(
+            "SELECT status, COUNT(*) FROM items WHERE job_id = ? GROUP BY status",
+            (job_id,)).fetchall())
+        finished = counts.get("done", 0) + counts.get("failed", 0)
+        return {
+            "job_id": job_id,
+            "source": job[0],
+            "created": job[1],
+            "total": job[2],
+            "pending": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "progress": round(finished / job[2], 4) if job[2] else 1.0,
+            "state": "completed" if finished == job[2] else "running",
+        }
+
+    def results(self, job_id: str, after: int = 0, limit: int = 1000) -> list[dict]:
+        """Finished items in completion order, starting after cursor ``after``.
+
+        Each entry carries its ``seq`` cursor; pass the last one back to get
+        only results that finished since.
+        """
+        rows = self._conn.execute(
+            "SELECT seq, idx, path, status, score, label, error FROM items "
+            "WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (job_id, after, limit)).fetchall()
+        out = []
+        for seq, idx, path, status, score, label, error in rows:
+            entry = {"seq": seq, "idx": idx, "path": path}
+            if status == "done":
+                entry.update({"score": score, "label": label})
+            else:
+                entry["error"] = error
+            out.append(entry)
+        return out
+
+    def requeue_running(self, pids: list[int] | None = None) -> int:
+        """Return items orphaned by dead workers to the pending state.
+
+        With ``pids``, only items claimed by those (known dead) processes
+        are requeued; otherwise every running item whose worker pid no
+        longer exists on this host. Items of live workers are left alone.
+        """
+        if pids is None:
+            workers = [w for (w,) in self._conn.execute(
+                "SELECT DISTINCT worker FROM items WHERE status = 'running'")]
+            pids = [w for w in workers if w is None or not _pid_alive(w)]
+        if not pids:
+            return 0
+        cur = self._conn.executemany(
+            "UPDATE items SET status = 'pending', worker = NULL "
+            "WHERE status = 'running' AND worker IS ?", [(p,) for p in pids])
+        return cur.rowcount
+
+    def claim(self, limit: int) -> list[tuple[str, int, str]]:
+        """Atomically mark up to ``limit`` pending items as running."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._conn.execute(
+                "SELECT job_id, idx, path FROM items WHERE status = 'pending' "
+                "ORDER BY job_id, idx LIMIT ?", (limit,)).fetchall()
+            self._conn.executemany(
+                "UPDATE items SET status = 'running', worker = ? "
+                "WHERE job_id = ? AND idx = ?",
+                [(os.getpid(), job_id, idx) for job_id, idx, _ in rows])
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def complete(self, claimed: list[tuple[str, int, str]], results: list[dict]) -> None:
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM items").fetchone()[0]
+            for (job_id, idx, _), result in zip(claimed, results):
+                seq += 1
+                if "error" in result:
+                    self._conn.execute(
+                        "UPDATE items SET status = 'failed', error = ?, finished = ?, "
+                        "seq = ? WHERE job_id = ? AND idx = ?",
+                        (result["error"], now, seq, job_id, idx))
+                else:
+                    self._conn.execute(
+                        "UPDATE items SET status = 'done', score = ?, label = ?, "
+                        "finished = ?, seq = ? WHERE job_id = ? AND idx = ?",
+                        (result["score"], result["label"], now, seq, job_id, idx))
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+
+def _pid_alive(pid: int) -> bool:
+    """True if a process with this pid exists on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # exists, owned by another user
+    return True
+
+
+def _work_loop(db_path: str, chunk: int, batch_size: int, decode_workers: int,
+               threads: int, poll_s: float) -> None:
+    """Claim, score and record chunks of items until terminated."""
+    import torch
+    torch.set_num_threads(threads)
+    from aasist_predictor import predict_many
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    store = JobStore(db_path)
+    while True:
+        claimed = store.claim(chunk)
+        if not claimed:
+            time.sleep(poll_s)
+            continue
+        results = predict_many([path for _, _, path in claimed],
+                               batch_size=batch_size,
+                               decode_workers=decode_workers)
+        store.complete(claimed, results)
+        logger.info(f"Worker {os.getpid()} scored {len(claimed)} items")
+
+
+def run_workers(db_path: str = DEFAULT_DB, workers: int = 1, chunk: int = 64,
+                batch_size: int = 16, decode_workers: int = 2,
+                poll_s: float = 1.0) -> None:
+    """Load AASIST once and fork ``workers`` scoring processes.
+
+    The parent stays in a supervision loop: a worker that dies has its
+    claimed items requeued and is replaced by a fresh fork.
+    """
+    import multiprocessing as mp
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+
+    store = JobStore(db_path)
+    requeued = store.requeue_running()
+    store.close()
+    if requeued:
+        logger.info(f"Re-queued {requeued} items left running by a previous run")
+
+    from aasist_predictor import share_weights
+    share_weights()
+
+    ctx = mp.get_context("fork")
+
+    def spawn():
+        p = ctx.Process(target=_work_loop,
+                        args=(str(db_path), chunk, batch_size, decode_workers,
+                              threads, poll_s), daemon=True)
+        p.start()
+        return p
+
+    procs = [spawn() for _ in range(workers)]
+    logger.info(f"Started {workers} job workers ({threads} threads each)")
+    try:
+        while True:
+            time.sleep(poll_s)
+            for i, p in enumerate(procs):
+                if p.is_alive():
+                    continue
+                requeued = store.requeue_running([p.pid])
+                store.close()  # never carry an open connection into a fork
+                logger.warning(f"Worker {p.pid} exited with code {p.exitcode}; "
+                               f"re-queued {requeued} items and restarting it")
+                procs[i] = spawn()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="AASIST offline scoring jobs")
+    parser.add_argument("--db", default=DEFAULT_DB, help="job database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_submit = sub.add_parser("submit", help="submit a directory or manifest")
+    p_submit.add_argument("source")
+
+    p_status = sub.add_parser("status", help="show job progress")
+    p_status.add_argument("job_id")
+
+    p_results = sub.add_parser("results", help="print finished results as JSON lines")
+    p_results.add_argument("job_id")
+    p_results.add_argument("--after", type=int, default=0,
+                           help="only results after this seq cursor")
+
+    p_worker = sub.add_parser("worker", help="run scoring workers")
+    p_worker.add_argument("--workers", type=int, default=1)
+    p_worker.add_argument("--chunk", type=int, default=64)
+    p_worker.add_argument("--batch-size", type=int, default=16)
+    p_worker.add_argument("--decode-workers", type=int, default=2)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "worker":
+        run_workers(args.db, args.workers, args.chunk, args.batch_size,
+                    args.decode_workers)
+        return 0
+
+    store = JobStore(args.db)
+    if args.command == "submit":
+        # Workers may run from another directory, so store an absolute path
+        print(store.submit(os.path.realpath(args.source)))
+    elif args.command == "status":
+        status = store.status(args.job_id)
+        if status is None:
+            print(f"Unknown job: {args.job_id}")
+            return 1
+        print(json.dumps(status, indent=2))
+    elif args.command == "results":
+        after = args.after
+        while True:
+            page = store.results(args.job_id, after=after)
+            if not page:
+                break
+            for entry in page:
+                print(json.dumps(entry))
+            after = page[-1]["seq"]
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
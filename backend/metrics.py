@@ -0,0 +1,159 @@
+"""
+Minimal Prometheus-style metrics (counters, gauges, histograms).
+
+Metrics register themselves in a module-level registry and ``render()``
+produces the Prometheus text exposition format. Everything is thread-safe,
+since inference stages are timed on worker threads. Values are
+per-process; with pre-forked workers each process reports its own.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0)
+
+_REGISTRY: list["_Metric"] = []
+
+
+def _label_str(labelnames, values, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[k]) for k in self.labelnames)
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self._samples())
+
+
+class Counter(_Metric):
+    """Monotonic counter. ``fn`` reads the value from elsewhere instead."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=(),
+                 fn: Callable[[], float] | None = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+        self._fn = fn
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        if self._fn is not None:
+            return [f"{self.name} {self._fn()}"]
+        with self._lock:
+            return [f"{self.name}{_label_str(self.labelnames, k)} {v}"
+                    for k, v in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """Point-in-time value, either set explicitly or read from ``fn``."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, fn: Callable[[], float] | None = None):
+        super().__init__(name, documentation)
+        self._value = 0.0
+        self._fn = fn
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def _samples(self):
+        value = self._fn() if self._fn is not None else self._value
+        return [f"{self.name} {value}"]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observed values (seconds by default)."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._data: dict[tuple, list] = {}  # key -> [bucket counts, sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, n = self._data.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._data[key] = [counts, total + value, n + 1]
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        out = []
+        with self._lock:
+            for key, (counts, total, n) in sorted(self._data.items()):
+                labels = _label_str(self.labelnames, key)
+                for bound, c in zip(self.buckets, counts):
+                    le = 'le="%s"' % bound
+                    out.append(f"{self.name}_bucket"
+                               f"{_label_str(self.labelnames, key, le)} {c}")
+                le = 'le="+Inf"'
+                out.append(f"{self.name}_bucket"
+                           f"{_label_str(self.labelnames, key, le)} {n}")
+                out.append(f"{self.name}_sum{labels} {total}")
+                out.append(f"{self.name}_count{labels} {n}")
+        return out
+
+
+def render() -> str:
+    """All registered metrics in Prometheus text format."""
+    return "\n".join(m.render() for m in _REGISTRY) + "\n"
+
+
+# Shared inference stage timings, recorded by aasist_predictor and app.
+STAGE_SECONDS = Histogram(
+    "aasist_stage_seconds",
+    "Time spent in each inference stage",
+    labelnames=("stage",))
+
+
+def stage_timer(stage: str):
+    """Context manager timing one inference stage into STAGE_SECONDS."""
+    return STAGE_SECONDS.time(stage=stage)
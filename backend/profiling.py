@@ -0,0 +1,155 @@
+"""
+Sampling profiler for the inference hot path.
+
+``sample(stage)`` wraps a piece of work (a decode, an AASIST forward, a
+``predict_wav`` call). With probability ``rate`` that call is recorded with
+``torch.profiler`` (Chrome trace) or cProfile (pstats) and the file is
+written to a directory that keeps only the newest ``keep`` traces.
+Operator/function times from every sample are also aggregated in memory
+for the top-N view served by ``/admin/profile``.
+
+Only one sample is recorded at a time per process; calls that arrive while
+another sample is running (or that are nested in one) run unprofiled. With
+the rate at 0 the cost is a single float comparison per call.
+"""
+
+import contextlib
+import cProfile
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MODES = ("torch", "cprofile")
+
+_NOOP = contextlib.nullcontext()
+
+
+class Profiler:
+    def __init__(self, rate: float = 0.0, mode: str = "torch",
+                 directory: str = "profiles", keep: int = 20):
+        self.directory = Path(directory)
+        self.keep = max(1, keep)
+        self.rate = 0.0
+        self.mode = "torch"
+        self.configure(rate, mode)
+        self.samples = 0
+        self._busy = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._ops: dict[str, list] = {}  # name -> [calls, self_ms, total_ms]
+
+    def configure(self, rate: float | None = None, mode: str | None = None) -> None:
+        if mode is not None:
+            if mode not in MODES:
+                raise ValueError(f"Unknown profiling mode '{mode}' (expected one of {MODES})")
+            self.mode = mode
+        if rate is not None:
+            if not 0.0 <= rate <= 1.0:
+                raise ValueError("Profiling rate must be between 0 and 1")
+            self.rate = rate
+
+    def reset(self) -> None:
+        with self._stats_lock:
+            self._ops.clear()
+            self.samples = 0
+
+    def sample(self, stage: str):
+        """Context manager that profiles this call with probability ``rate``."""
+        if self.rate <= 0.0 or random.random() >= self.rate:
+            return _NOOP
+        if not self._busy.acquire(blocking=False):
+            return _NOOP
+        return self._record(stage)
+
+    @contextlib.contextmanager
+    def _record(self, stage: str):
+        try:
+            if self.mode == "torch":
+                with self._torch_profile(stage):
+                    yield
+            else:
+                with self._cprofile(stage):
+                    yield
+        finally:
+            self._busy.release()
+
+    @contextlib.contextmanager
+    def _torch_profile(self, stage: str):
+        from torch.profiler import ProfilerActivity, profile
+
+        with profile(activities=[ProfilerActivity.CPU], record_shapes=True) as prof:
+            yield
+        try:
+            prof.export_chrome_trace(str(self._next_path(stage, ".json")))
+            self._add({e.key: (e.count, e.self_cpu_time_total / 1000,
+                               e.cpu_time_total / 1000)
+                       for e in prof.key_averages()})
+        except Exception:
+            logger.exception("Could not save torch profile")
+
+    @contextlib.contextmanager
+    def _cprofile(self, stage: str):
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+        try:
+            prof.dump_stats(str(self._next_path(stage, ".pstats")))
+            stats = pstats.Stats(prof).stats
+            self._add({f"{func} ({os.path.basename(file)}:{line})":
+                       (nc, tt * 1000, ct * 1000)
+                       for (file, line, func), (_, nc, tt, ct, _) in stats.items()})
+        except Exception:
+            logger.exception("Could not save cProfile stats")
+
+    def _next_path(self, stage: str, suffix: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{stage}-{os.getpid()}-{time.time_ns()}{suffix}"
+        traces = sorted((p for p in self.directory.iterdir() if p.suffix in (".json", ".pstats")),
+                        key=lambda p: p.stat().st_mtime)
+        for old in traces[:max(0, len(traces) - self.keep + 1)]:
+            old.unlink(missing_ok=True)
+        return path
+
+    def _add(self, ops: dict) -> None:
+        with self._stats_lock:
+            self.samples += 1
+            for name, (calls, self_ms, total_ms) in ops.items():
+                entry = self._ops.setdefault(name, [0, 0.0, 0.0])
+                entry[0] += calls
+                entry[1] += self_ms
+                entry[2] += total_ms
+
+    def top(self, n: int = 20) -> list[dict]:
+        """The ``n`` operators/functions with the most self time so far."""
+        with self._stats_lock:
+            ranked = sorted(self._ops.items(), key=lambda kv: kv[1][1], reverse=True)[:n]
+        return [{"name": name, "calls": calls, "self_ms": round(self_ms, 3),
+                 "total_ms": round(total_ms, 3)}
+                for name, (calls, self_ms, total_ms) in ranked]
+
+    def stats(self) -> dict:
+        return {
+            "rate": self.rate,
+            "mode": self.mode,
+            "directory": str(self.directory),
+            "keep": self.keep,
+            "samples": self.samples,
+        }
+
+
+# Process-wide profiler used by aasist_predictor. AASIST_PROFILE_RATE=0
+# (the default) leaves it off; it can also be switched via /admin/profile.
+profiler = Profiler(
+    rate=float(os.getenv("AASIST_PROFILE_RATE", "0")),
+    mode=os.getenv("AASIST_PROFILE_MODE", "torch"),
+    directory=os.getenv("AASIST_PROFILE_DIR", "profiles"),
+    keep=int(os.getenv("AASIST_PROFILE_KEEP", "20")),
+)
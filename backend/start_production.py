@@ -4,6 +4,8 @@ Production startup script for AASIST Deepfake Audio Detection API.
 """
 
 import os
+import signal
+import socket
 import sys
 import uvicorn
 import logging
@@ -41,6 +43,81 @@ def check_prerequisites():
     
     return True
 
+def _worker_settings():
+    """Worker count and per-worker intra-op threads from the environment."""
+    workers = max(1, int(os.getenv("AASIST_WORKERS", "1")))
+    default_threads = max(1, (os.cpu_count() or 1) // workers)
+    threads = max(1, int(os.getenv("AASIST_THREADS_PER_WORKER", default_threads)))
+    return workers, threads
+
+def _run_worker(sock, threads):
+    """Body of a forked worker: pin threads and serve on the inherited socket."""
+    import torch
+    torch.set_num_threads(threads)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    config = uvicorn.Config("app:app", log_level="info", access_log=True)
+    uvicorn.Server(config).run(sockets=[sock])
+
+def serve_prefork(workers, threads, host="0.0.0.0", port=8000):
+    """
+    Load AASIST once, then fork `workers` uvicorn processes that share it.
+
+    The weights are moved to shared memory before forking, so every worker
+    maps the same pages instead of holding its own copy. Dead workers are
+    re-forked from the parent, which keeps the loaded model.
+    """
+    from app import app  # noqa: F401  (imported once, pre-fork)
+    from aasist_predictor import share_weights
+    share_weights()  # loads the model in the parent, then shares it
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    children = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(sock, threads)
+            finally:
+                os._exit(0)
+        children[pid] = True
+        logger.info(f"👷 Worker {pid} started ({threads} threads)")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.pop(pid, None)
+        if not stopping:
+            logger.warning(f"⚠️ Worker {pid} exited ({status}), restarting")
+            spawn()
+    sock.close()
+
 def main():
     """Main function to start the production server."""
     logger.info("🚀 Starting AASIST Deepfake Audio Detection API...")
@@ -53,16 +130,23 @@ def main():
         logger.error("❌ Prerequisites not met. Exiting.")
         sys.exit(1)
     
-    # Test model loading
-    try:
-        logger.info("🧠 Testing AASIST model loading...")
-        from aasist_predictor import _model
-        if _model is None:
-            raise RuntimeError("Model failed to load")
-        logger.info("✅ AASIST model loaded successfully")
-    except Exception as e:
-        logger.error(f"❌ Failed to load AASIST model: {e}")
-        sys.exit(1)
+    workers, threads = _worker_settings()
+    # Must be set before torch is imported so the parent never starts a
+    # full-size OpenMP pool that forked workers would inherit.
+    os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+
+    # Pre-fork workers share one model, so it must be loaded up front.
+    # A single worker loads it in the background after the server is up
+    # (see /health/ready), keeping startup fast.
+    if workers > 1:
+        try:
+            logger.info("🧠 Loading AASIST model before forking...")
+            from aasist_predictor import load_model
+            load_model()
+            logger.info("✅ AASIST model loaded successfully")
+        except Exception as e:
+            logger.error(f"❌ Failed to load AASIST model: {e}")
+            sys.exit(1)
     
     # Start the server
     try:
@@ -71,14 +155,20 @@ def main():
         logger.info("📍 API documentation at: http://0.0.0.0:8000/docs")
         logger.info("🏥 Health check at: http://0.0.0.0:8000/health")
         
-        uvicorn.run(
-            "app:app",
-            host="0.0.0.0",
-            port=8000,
-            log_level="info",
-            access_log=True,
-            workers=1  # AASIST model doesn't support multi-processing
-        )
+        if workers > 1:
+            logger.info(f"🧵 Pre-forking {workers} workers x {threads} threads")
+            serve_prefork(workers, threads)
+        else:
+            import torch
+            torch.set_num_threads(threads)
+            uvicorn.run(
+                "app:app",
+                host="0.0.0.0",
+                port=8000,
+                log_level="info",
+                access_log=True,
+                workers=1  # multi-worker mode goes through serve_prefork
+            )
     except KeyboardInterrupt:
         logger.info("🛑 Server stopped by user")
     except Exception as e:
@@ -0,0 +1,120 @@
+"""
+Per-session state for live audio streaming.
+
+A session turns raw PCM frames into fixed-size 16 kHz windows: samples go
+into a ring buffer holding one window at the source rate, and a window is
+released for scoring every time another ``hop`` samples have arrived. Only
+released windows are resampled, in one piece, so frame boundaries never
+introduce resampler edge artefacts or drift in the sample count.
+"""
+
+import math
+
+
+import numpy as np
+import torch
+
+from aasist_predictor import check_sample_rate, resample_to_16k
+
+_FORMATS = {"int16": (np.int16, 1 / 32768), "float32": (np.float32, 1.0)}
+
+
+class RingBuffer:
+    """Fixed-size float32 buffer that keeps the most recent ``size`` samples."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._buf = np.zeros(size, dtype=np.float32)
+        self._pos = 0
+        self.total = 0
+
+    def extend(self, samples: np.ndarray) -> None:
+        n = samples.shape[0]
+        self.total += n
+        if n >= self.size:
+            self._buf[:] = samples[-self.size:]
+            self._pos = 0
+            return
+        end = self._pos + n
+        if end <= self.size:
+            self._buf[self._pos:end] = samples
+        else:
+            split = self.size - self._pos
+            self._buf[self._pos:] = samples[:split]
+            self._buf[:n - split] = samples[split:]
+        self._pos = end % self.size
+
+    def window(self) -> np.ndarray:
+        """Buffer contents in arrival order (oldest sample first)."""
+        return np.concatenate((self._buf[self._pos:], self._buf[:self._pos]))
+
+
+class StreamSession:
+    """Accumulate PCM frames and emit a window whenever a hop completes.
+
+    Memory per session is one window plus at most one partial sample of
+    leftover bytes, regardless of how long the stream runs.
+    """
+
+    def __init__(self, window: int, hop: int, sample_rate: int = 16000,
+                 fmt: str = "int16"):
+        if fmt not in _FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}' (expected int16 or float32)")
+        if hop <= 0:
+            raise ValueError("hop must be positive")
+        self.window_size = window
+        self.hop = hop
+        self.sample_rate = check_sample_rate(sample_rate)
+        self._dtype, self._scale = _FORMATS[fmt]
+        self._itemsize = np.dtype(self._dtype).itemsize
+        # Window and hop in source samples; a 10 ms margin keeps the start
+        # of the kept window clear of the resampler's edge handling
+        ratio = sample_rate / 16000
+        margin = 0 if sample_rate == 16000 else sample_rate // 100
+        self._src_window = math.ceil(window * ratio) + margin
+        self._src_hop = max(1, round(hop * ratio))
+        self._ring = RingBuffer(self._src_window)
+        self._leftover = b""
+        self._since_score = 0
+        self._scored = False
+
+    @property
+    def seconds(self) -> float:
+        """Audio received so far, in seconds."""
+        return self._ring.total / self.sample_rate
+
+    def _decode(self, frame: bytes) -> np.ndarray:
+        data = self._leftover + frame
+        usable = len(data) - len(data) % self._itemsize
+        self._leftover = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=self._dtype)
+        return samples.astype(np.float32) * self._scale
+
+    def to_16k(self, window: np.ndarray) -> np.ndarray:
+        """Resample a window returned by ``feed`` to ``window_size`` samples
+        at 16 kHz. This is the expensive step; run it off the event loop."""
+        if self.sample_rate != 16000:
+            window = resample_to_16k(
+                torch.from_numpy(window), self.sample_rate).numpy()
+        return window[-self.window_size:]
+
+    def feed(self, frame: bytes) -> np.ndarray | None:
+        """Append a frame; return the latest full window if a hop completed.
+
+        The window is a copy at the source rate; pass it to ``to_16k``.
+        Buffering is cheap, so frames can be fed on the event loop. If one
+        frame completes several hops only the newest window is returned,
+        so a slow client never builds up a scoring backlog.
+        """
+        samples = self._decode(frame)
+        if not samples.size:
+            return None
+        self._ring.extend(samples)
+        self._since_score += samples.shape[0]
+        if self._ring.total < self._src_window:
+            return None
+        if self._scored and self._since_score < self._src_hop:
+            return None
+        self._scored = True
+        self._since_score = 0
+        return self._ring.window()
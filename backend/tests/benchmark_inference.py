@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Reproducible inference benchmark with regression gating.
+
+Measures, each in a fresh interpreter where it matters:
+  - cold start: import, model load and first forward pass
+  - single-clip latency of predict_wav (decode + preprocess + forward) per
+    clip length
+  - batched forward throughput per thread count and batch size
+  - end-to-end HTTP throughput of POST /predict/ under concurrent load,
+    against --url or a uvicorn server started for the run
+
+Results are written as JSON. Comparing against a baseline run fails (exit
+code 1) when any shared metric is slower by more than --max-slowdown.
+With --random-init the model uses seeded random weights, so the suite runs
+without AASIST.pth (scores are meaningless, timings are not).
+
+Usage:
+    python tests/benchmark_inference.py --random-init --output bench.json
+    python tests/benchmark_inference.py --random-init --baseline bench.json --max-slowdown 0.1
+    python tests/benchmark_inference.py --compare old.json new.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _percentiles(samples_s: list[float]) -> dict:
+    ordered = sorted(samples_s)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99)}
+
+
+def _metric(value: float, unit: str, higher_is_better: bool = False) -> dict:
+    return {"value": round(value, 4), "unit": unit, "higher_is_better": higher_is_better}
+
+
+def _wav_bytes(seconds: float, sr: int = 16000, seed: int = 0) -> bytes:
+    import numpy as np
+    import soundfile as sf
+
+    rng = np.random.default_rng(seed)
+    audio = (rng.standard_normal(int(sr * seconds)) * 0.1).astype("float32")
+    buf = io.BytesIO()
+    sf.write(buf, audio, sr, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+# ---------------------------------------------------------------
+# Cold start (child process)
+# ---------------------------------------------------------------
+def _cold_start_child():
+    t0 = time.perf_counter()
+    sys.path.insert(0, str(BACKEND_DIR))
+    import aasist_predictor as ap
+    t1 = time.perf_counter()
+    ap.load_model()
+    t2 = time.perf_counter()
+    ap.warmup()
+    t3 = time.perf_counter()
+    print(json.dumps({"import_s": t1 - t0, "load_s": t2 - t1, "first_forward_s": t3 - t2}))
+
+
+def bench_cold_start(runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, __file__, "--cold-start-child"],
+                              capture_output=True, text=True, cwd=BACKEND_DIR)
+        if proc.returncode != 0:
+            raise RuntimeError(f"cold start run failed:\n{proc.stderr}")
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    out = {}
+    for key in ("import_s", "load_s", "first_forward_s"):
+        out[f"cold_start.{key[:-2]}"] = _metric(
+            statistics.median(s[key] for s in samples) * 1000, "ms")
+    out["cold_start.total"] = _metric(
+        statistics.median(sum(s.values()) for s in samples) * 1000, "ms")
+    return out
+
+
+# ---------------------------------------------------------------
+# In-process latency / throughput
+# ---------------------------------------------------------------
+def bench_single_clip(ap, clip_seconds: list[float], repeats: int) -> dict:
+    out = {}
+    for seconds in clip_seconds:
+        data = _wav_bytes(seconds)
+        ap.predict_wav(data)  # warm-up
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            ap.predict_wav(data)
+            samples.append(time.perf_counter() - start)
+        for name, ms in _percentiles(samples).items():
+            out[f"single_clip.{seconds:g}s.{name}"] = _metric(ms, "ms")
+    return out
+
+
+def bench_batched(ap, batch_sizes: list[int], threads: list[int], repeats: int) -> dict:
+    import torch
+
+    model = ap.load_model()
+    default_threads = torch.get_num_threads()
+    out = {}
+    try:
+        for n in threads:
+            torch.set_num_threads(n)
+            for bs in batch_sizes:
+                batch = torch.randn(bs, ap._nb_samp, generator=torch.Generator().manual_seed(bs))
+                with torch.no_grad():
+                    model(batch)  # warm-up
+                    start = time.perf_counter()
+                    for _ in range(repeats):
+                        model(batch)
+                elapsed = time.perf_counter() - start
+                out[f"batched.threads{n}.bs{bs}"] = _metric(
+                    bs * repeats / elapsed, "clips/s", higher_is_better=True)
+    finally:
+        torch.set_num_threads(default_threads)
+    return out
+
+
+# ---------------------------------------------------------------
+# HTTP load
+# ---------------------------------------------------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(timeout: float = 120.0):
+    import requests
+
+    port = _free_port()
+    # Result cache off, so every request pays for decode + forward
+    env = dict(os.environ, AASIST_CACHE_SIZE="0")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if requests.get(f"{url}/health/ready", timeout=1).status_code == 200:
+                return proc, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError(f"server not ready after {timeout:.0f} s")
+
+
+def bench_http(url: str, concurrency: list[int], requests_per_level: int,
+               clip_seconds: float) -> dict:
+    import requests
+
+    def one(session, data):
+        start = time.perf_counter()
+        r = session.post(f"{url}/predict/", files={"file": ("bench.wav", data, "audio/wav")})
+        return time.perf_counter() - start, r.status_code
+
+    out = {}
+    seed = 0
+    for level in concurrency:
+        # Unique audio per request, so a cache on the server (e.g. with
+        # --url) cannot answer repeats; generated before the clock starts
+        payloads = [_wav_bytes(clip_seconds, seed=seed + i)
+                    for i in range(requests_per_level + 1)]
+        seed += len(payloads)
+        sessions = [requests.Session() for _ in range(level)]
+        one(sessions[0], payloads[-1])  # warm-up
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            results = list(pool.map(one, (sessions[i % level] for i in range(requests_per_level)),
+                                    payloads[:requests_per_level]))
+        elapsed = time.perf_counter() - start
+        ok = [t for t, code in results if code == 200]
+        prefix = f"http.c{level}"
+        out[f"{prefix}.throughput"] = _metric(len(ok) / elapsed, "req/s", higher_is_better=True)
+        out[f"{prefix}.errors"] = _metric(len(results) - len(ok), "count")
+        if ok:
+            for name, ms in _percentiles(ok).items():
+                out[f"{prefix}.{name}"] = _metric(ms, "ms")
+    return out
+
+
+# ---------------------------------------------------------------
+# Comparison
+# ---------------------------------------------------------------
+def compare(baseline: dict, current: dict, max_slowdown: float) -> int:
+    """Print per-metric changes; return 1 if any metric regressed too far."""
+    old, new = baseline["metrics"], current["metrics"]
+    failed = []
+    print(f"{'metric':<36}{'baseline':>12}{'current':>12}{'slowdown':>10}")
+    for name in sorted(set(old) & set(new)):
+        a, b = old[name]["value"], new[name]["value"]
+        if name.endswith(".errors"):
+            slowdown = float(b > a)
+        elif new[name]["higher_is_better"]:
+            slowdown = a / b - 1 if b else float("inf")
+        else:
+            slowdown = b / a - 1 if a else 0.0
+        flag = "❌" if slowdown > max_slowdown else "  "
+        if slowdown > max_slowdown:
+            failed.append(name)
+        print(f"{name:<36}{a:>12.2f}{b:>12.2f}{slowdown:>+9.1%} {flag}")
+    if baseline.get("environment") != current.get("environment"):
+        print("⚠️  Runs come from different environments; compare with care")
+    if failed:
+        print(f"❌ {len(failed)} metric(s) slower than the {max_slowdown:.0%} budget")
+        return 1
+    print(f"✅ No metric slower than the {max_slowdown:.0%} budget")
+    return 0
+
+
+def _environment(ap) -> dict:
+    import torch
+
+    return {
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "backend": ap._BACKEND,
+        "inference_mode": ap._INFERENCE_MODE,
+        "random_init": ap._RANDOM_INIT,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AASIST inference benchmark")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to gate against")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="only compare two existing result files")
+    parser.add_argument("--max-slowdown", type=float, default=0.10,
+                        help="allowed relative slowdown per metric (default 0.10)")
+    parser.add_argument("--random-init", action="store_true",
+                        help="use seeded random weights (no AASIST.pth needed)")
+    parser.add_argument("--cold-start-runs", type=int, default=3)
+    parser.add_argument("--clip-seconds", type=float, nargs="+", default=[2.0, 4.0, 10.0])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--http", action="store_true",
+                        help="also load-test POST /predict/ (starts a server unless --url)")
+    parser.add_argument("--url", help="existing server to load-test")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--skip", nargs="*", default=[],
+                        choices=["cold_start", "single_clip", "batched"])
+    parser.add_argument("--cold-start-child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        runs = [json.loads(Path(p).read_text()) for p in args.compare]
+        return compare(*runs, args.max_slowdown)
+
+    if args.random_init:
+        os.environ["AASIST_RANDOM_INIT"] = "1"
+    if args.cold_start_child:
+        _cold_start_child()
+        return 0
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    import torch
+    torch.manual_seed(0)
+    import aasist_predictor as ap
+
+    print("⏱️  AASIST inference benchmark")
+    print("=" * 60)
+    metrics = {}
+    try:
+        if "cold_start" not in args.skip:
+            print("🧪 Cold start...")
+            metrics.update(bench_cold_start(args.cold_start_runs))
+        if "single_clip" not in args.skip:
+            print("🧪 Single-clip latency...")
+            metrics.update(bench_single_clip(ap, args.clip_seconds, args.repeats))
+        if "batched" not in args.skip:
+            print("🧪 Batched throughput...")
+            metrics.update(bench_batched(ap, args.batch_sizes, args.threads, args.repeats))
+        if args.http or args.url:
+            print("🧪 HTTP load...")
+            server = None
+            url = args.url
+            if url is None:
+                server, url = _start_server()
+            try:
+                metrics.update(bench_http(url, args.concurrency, args.requests,
+                                          args.clip_seconds[0]))
+            finally:
+                if server is not None:
+                    server.terminate()
+                    server.wait()
+    except Exception as e:
+        print(f"❌ Benchmark failed: {e}")
+        return 1
+
+    for name, m in metrics.items():
+        print(f"   {name:<36}{m['value']:>12.2f} {m['unit']}")
+    result = {"environment": _environment(ap), "created": time.time(), "metrics": metrics}
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2))
+        print(f"✅ Results saved to {args.output}")
+
+    if args.baseline:
+        print("=" * 60)
+        return compare(json.loads(Path(args.baseline).read_text()), result, args.max_slowdown)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Accuracy-drift check for optimised AASIST inference modes.
+
+Scores a reference set with the fp32 model and with the requested
+AASIST_INFERENCE_MODE variant (int8, script, compile, or a "+" combination),
+then reports per-file score differences, label flips and latency.
+Exits non-zero if drift exceeds the tolerance.
+
+Usage:
+    python tests/check_inference_drift.py --mode int8+script [--dir tests/test_dataset]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+import torch
+import aasist_predictor as ap
+
+
+def score(model, clips):
+    """Fake probabilities for a list of preprocessed clips, plus seconds taken."""
+    start = time.perf_counter()
+    with torch.no_grad():
+        logits = model(torch.stack(clips).to(ap._DEVICE))[1]
+    elapsed = time.perf_counter() - start
+    return torch.softmax(logits, dim=1)[:, 1].cpu(), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare optimised AASIST against fp32")
+    parser.add_argument("--mode", required=True, help="e.g. int8, script, int8+script")
+    parser.add_argument("--dir", default=str(Path(__file__).parent / "test_dataset"),
+                        help="reference set of WAV/FLAC files")
+    parser.add_argument("--max-drift", type=float, default=0.02,
+                        help="maximum allowed absolute score difference")
+    parser.add_argument("--max-flips", type=int, default=0,
+                        help="maximum allowed real/fake label flips")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="rebuild the variant instead of loading a cached artifact")
+    args = parser.parse_args()
+
+    files = sorted(p for p in Path(args.dir).iterdir()
+                   if p.suffix.lower() in (".wav", ".flac"))
+    if not files:
+        print(f"❌ No reference audio found in {args.dir}")
+        return 1
+
+    print(f"🧪 Drift check: fp32 vs {args.mode} on {len(files)} files")
+    print("=" * 60)
+    clips = [ap.load_clip(f) for f in files]
+    base = ap.build_model("fp32")
+    optimised = ap.build_model(args.mode, use_cache=not args.no_cache)
+    if optimised is base:
+        print(f"❌ '{args.mode}' did not produce an optimised model (see warnings)")
+        return 1
+
+    # Warm-up pass so one-off compilation is not counted as latency
+    score(optimised, clips[:1])
+    ref, t_ref = score(base, clips)
+    opt, t_opt = score(optimised, clips)
+
+    diff = (ref - opt).abs()
+    flips = int(((ref > 0.5) != (opt > 0.5)).sum())
+    for f, r, o, d in zip(files, ref.tolist(), opt.tolist(), diff.tolist()):
+        print(f"   {f.name:<40} fp32={r:.4f}  {args.mode}={o:.4f}  |Δ|={d:.4f}")
+
+    print("=" * 60)
+    print(f"📊 max |Δ| = {diff.max():.5f}, mean |Δ| = {diff.mean():.5f}, label flips = {flips}")
+    print(f"⏱️  fp32 {t_ref / len(clips) * 1000:.1f} ms/clip, "
+          f"{args.mode} {t_opt / len(clips) * 1000:.1f} ms/clip")
+
+    if diff.max() > args.max_drift or flips > args.max_flips:
+        print("❌ Drift exceeds tolerance")
+        return 1
+    print("✅ Drift within tolerance")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
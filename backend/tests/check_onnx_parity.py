@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Parity and cost comparison between the torch and ONNX Runtime backends.
+
+Each backend runs in its own subprocess so that startup time and resident
+memory are measured from a clean interpreter. The parent compares the
+scores on a reference set and prints startup, RSS and per-batch latency.
+
+Usage:
+    python export_onnx.py
+    python tests/check_onnx_parity.py [--dir tests/test_dataset] [--tolerance 1e-3]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _child(backend_dir, files, batch_sizes, repeats):
+    """Measure one backend (selected via AASIST_BACKEND) and print JSON."""
+    t0 = time.perf_counter()
+    sys.path.insert(0, str(backend_dir))
+    import torch
+    import aasist_predictor as ap
+    model = ap.load_model()
+    startup = time.perf_counter() - t0
+
+    clips = [ap.load_clip(f) for f in files]
+    scores = [r["score"] for r in ap.predict_batch(clips)]
+
+    latency = {}
+    for bs in batch_sizes:
+        batch = torch.randn(bs, ap._nb_samp)
+        with torch.no_grad():
+            model(batch)  # warm-up
+            start = time.perf_counter()
+            for _ in range(repeats):
+                model(batch)
+        latency[bs] = (time.perf_counter() - start) / repeats * 1000
+
+    print(json.dumps({
+        "startup_s": startup,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "scores": scores,
+        "batch_ms": latency,
+    }))
+
+
+def run_backend(backend, files, batch_sizes, repeats):
+    env = dict(os.environ, AASIST_BACKEND=backend, AASIST_INFERENCE_MODE="fp32")
+    proc = subprocess.run(
+        [sys.executable, __file__, "--child", "--repeats", str(repeats),
+         "--batch-sizes", *map(str, batch_sizes), "--files", *map(str, files)],
+        env=env, capture_output=True, text=True, cwd=BACKEND_DIR)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{backend} backend failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="torch vs ONNX Runtime parity check")
+    parser.add_argument("--dir", default=str(Path(__file__).parent / "test_dataset"))
+    parser.add_argument("--tolerance", type=float, default=1e-3,
+                        help="maximum allowed absolute score difference")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--files", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(BACKEND_DIR, args.files, args.batch_sizes, args.repeats)
+        return 0
+
+    files = sorted(p.resolve() for p in Path(args.dir).iterdir()
+                   if p.suffix.lower() in (".wav", ".flac"))
+    if not files:
+        print(f"❌ No reference audio found in {args.dir}")
+        return 1
+
+    print(f"🧪 torch vs ONNX Runtime on {len(files)} files")
+    print("=" * 60)
+    results = {}
+    for backend in ("torch", "onnx"):
+        try:
+            results[backend] = run_backend(backend, files, args.batch_sizes, args.repeats)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            return 1
+
+    ref, onnx = results["torch"]["scores"], results["onnx"]["scores"]
+    diffs = [abs(a - b) for a, b in zip(ref, onnx)]
+    for f, a, b, d in zip(files, ref, onnx, diffs):
+        print(f"   {f.name:<40} torch={a:.5f}  onnx={b:.5f}  |Δ|={d:.2e}")
+
+    print("=" * 60)
+    print(f"{'':<8}{'startup s':>10}{'RSS MB':>10}" +
+          "".join(f"{f'bs={bs} ms':>12}" for bs in args.batch_sizes))
+    for backend, r in results.items():
+        print(f"{backend:<8}{r['startup_s']:>10.2f}{r['rss_mb']:>10.0f}" +
+              "".join(f"{r['batch_ms'][str(bs)]:>12.1f}" for bs in args.batch_sizes))
+
+    if max(diffs) > args.tolerance:
+        print(f"❌ Max score difference {max(diffs):.2e} exceeds {args.tolerance}")
+        return 1
+    print(f"✅ Backends agree (max |Δ| = {max(diffs):.2e})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
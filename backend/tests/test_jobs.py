@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test the offline job queue: claim -> requeue of a dead worker -> reclaim.
+
+Runs without the model or a server:
+    python tests/test_jobs.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobs import JobStore
+
+
+def _dead_pid() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def test_requeue_dead_worker():
+    """Items of a dead worker are requeued; items of live workers are not."""
+    with tempfile.TemporaryDirectory() as tmp:
+        audio = Path(tmp) / "audio"
+        audio.mkdir()
+        for name in ("a.wav", "b.flac"):
+            (audio / name).write_bytes(b"")
+        store = JobStore(Path(tmp) / "jobs.sqlite")
+        job_id = store.submit(audio)
+
+        claimed = store.claim(1)
+        assert len(claimed) == 1
+        # Claimed by this (live) process: left alone
+        assert store.requeue_running() == 0
+        assert store.status(job_id)["running"] == 1
+
+        # Pretend the claiming worker died
+        store._conn.execute("UPDATE items SET worker = ? WHERE status = 'running'",
+                            (_dead_pid(),))
+        assert store.requeue_running() == 1
+        assert store.status(job_id)["running"] == 0
+
+        reclaimed = store.claim(1)
+        assert reclaimed == claimed
+        store.close()
+    print("✅ claim -> requeue -> reclaim")
+
+
+if __name__ == "__main__":
+    test_requeue_dead_worker()
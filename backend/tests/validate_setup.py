@@ -34,8 +34,9 @@ def main():
     # Test imports
     print("\n🧠 Testing imports...")
     try:
-        from aasist_predictor import _model
-        print("  ✅ AASIST model imported")
+        from aasist_predictor import load_model
+        load_model()
+        print("  ✅ AASIST model loaded")
     except Exception as e:
         print(f"  ❌ AASIST import failed: {e}")
         all_good = False